@@ -1,17 +1,34 @@
 import tkinter as tk
-from tkinter import scrolledtext, messagebox, filedialog
+from tkinter import scrolledtext, messagebox, filedialog, ttk
 from PIL import Image, ImageTk
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lsa import LsaSummarizer
-from sumy.nlp.stemmers import Stemmer
-from sumy.utils import get_stop_words
-import pyttsx3
+try:
+    from sumy.parsers.plaintext import PlaintextParser
+    from sumy.nlp.tokenizers import Tokenizer
+    from sumy.summarizers.lsa import LsaSummarizer
+    from sumy.nlp.stemmers import Stemmer
+    from sumy.utils import get_stop_words
+except ImportError:
+    PlaintextParser = None
 import nltk
-import os
-import requests
-import time
 import threading
+import subprocess
+import logging
+import hashlib
+from collections import OrderedDict
+
+import backend_utils  # noqa: F401 (shared helpers live in the FastAPI backend's utils package)
+from utils.cache import TranscriptCache
+from qa_index import SentenceIndex
+import assemblyai_client as aai
+from speech import SpeechQueue
+try:
+    # Vectorized offline summarizer, used when sumy isn't installed
+    from utils.summarizer import get_summarizer
+except ImportError:
+    get_summarizer = None
+
+RANKING_CACHE_SIZE = 16  # sentence rankings kept for recently summarized texts
+QA_TOP_K = 3  # passages returned per question
 
 # Download required NLTK data
 def download_nltk_data():
@@ -30,17 +47,36 @@ class TextSummarizerApp:
         self.transcription = ""
         self.is_transcribing = False
         
-        # Initialize text-to-speech engine
+        # Text-to-speech runs on its own thread, one sentence at a time
         try:
-            self.engine = pyttsx3.init()
-            self.engine.setProperty('rate', 150)
+            self.speech = SpeechQueue(rate=150)
         except Exception as e:
             messagebox.showwarning("TTS Error", f"Text-to-speech initialization failed: {str(e)}")
-            self.engine = None
+            self.speech = None
         
         # Default audio URL
         self.audio_url = "https://assembly.ai/wildfires.mp3"
         
+        # Transcripts for URLs we've already seen (same ETag/size) are reused
+        self.cache = TranscriptCache()
+        self.http = None
+        self.http_key = None
+        # Optionally cut long silences locally before upload (needs ffmpeg). Off by default:
+        # it downloads the recording and re-uploads it instead of just sending the URL
+        self.trim_silence = tk.BooleanVar(value=False)
+        
+        # Summarizer objects are built once; rankings are cached per text hash so a
+        # different summary length is just a different slice
+        if PlaintextParser is not None:
+            self.tokenizer = Tokenizer("english")
+            self.lsa = LsaSummarizer(Stemmer("english"))
+            self.lsa.stop_words = get_stop_words("english")
+        self.rankings = OrderedDict()
+        self.summary_job = 0
+        
+        # BM25 index over the transcript sentences, refreshed incrementally per question
+        self.qa_index = SentenceIndex()
+        
         self.create_widgets()
         
     def create_widgets(self):
@@ -60,6 +96,7 @@ class TextSummarizerApp:
         self.url_entry = tk.Entry(url_frame, width=60)
         self.url_entry.pack(side="left", expand=True, fill="x")
         self.url_entry.insert(0, self.audio_url)
+        tk.Checkbutton(url_frame, text="Trim silence", variable=self.trim_silence).pack(side="left", padx=(5, 0))
         
         # Text input
         tk.Label(self.root, text="Enter Text or Transcribe Audio:").grid(row=2, column=0, padx=10, pady=5, sticky="w")
@@ -90,6 +127,15 @@ class TextSummarizerApp:
         
         # Summary output
         tk.Label(self.root, text="Summary:").grid(row=5, column=0, padx=10, pady=5, sticky="w")
+        
+        # Progress indicator and cancel button, shown while a summary is computed
+        self.summary_progress = ttk.Progressbar(self.root, mode="indeterminate", length=200)
+        self.summary_progress.grid(row=5, column=1, padx=10, pady=5, sticky="e")
+        self.summary_progress.grid_remove()
+        self.cancel_summary_button = tk.Button(self.root, text="Cancel", command=self.cancel_summary,
+                                               bg="#f44336", fg="white", padx=10)
+        self.cancel_summary_button.grid(row=5, column=2, padx=10, pady=5, sticky="e")
+        self.cancel_summary_button.grid_remove()
         self.summary_output = scrolledtext.ScrolledText(self.root, wrap=tk.WORD, width=80, height=10)
         self.summary_output.grid(row=6, column=0, columnspan=3, padx=10, pady=5)
         
@@ -120,11 +166,24 @@ class TextSummarizerApp:
                                        bg="#2196F3", fg="white", padx=15, pady=5)
         speak_summary_button.pack(side="right", padx=5)
         
+        # Playback controls
+        stop_speech_button = tk.Button(action_frame, text="Stop", command=self.stop_speech,
+                                       bg="#795548", fg="white", padx=10, pady=5)
+        stop_speech_button.pack(side="right", padx=5)
+        
+        skip_speech_button = tk.Button(action_frame, text="Skip", command=self.skip_speech,
+                                       bg="#795548", fg="white", padx=10, pady=5)
+        skip_speech_button.pack(side="right", padx=5)
+        
+        self.pause_speech_button = tk.Button(action_frame, text="Pause", command=self.toggle_speech_pause,
+                                             bg="#795548", fg="white", padx=10, pady=5)
+        self.pause_speech_button.pack(side="right", padx=5)
+        
         # Q&A Frame
         qa_frame = tk.Frame(self.root)
         qa_frame.grid(row=8, column=0, columnspan=3, padx=10, pady=5, sticky="ew")
         
-        tk.Label(qa_frame, text="Ask a question about the summary:").pack(side="left", padx=(0, 5))
+        tk.Label(qa_frame, text="Ask a question about the transcript:").pack(side="left", padx=(0, 5))
         self.question_entry = tk.Entry(qa_frame, width=50)
         self.question_entry.pack(side="left", expand=True, fill="x", padx=(0, 5))
         
@@ -161,67 +220,18 @@ class TextSummarizerApp:
             self.root.after(0, lambda: self.summary_output.delete("1.0", tk.END))
             self.root.after(0, lambda: self.summary_output.insert(tk.END, "Transcribing audio... Please wait..."))
             
-            # Submit transcription request
-            headers = {"authorization": api_key, "content-type": "application/json"}
-            response = requests.post(
-                "https://api.assemblyai.com/v2/transcript",
-                json={"audio_url": audio_url, "speaker_labels": True},
-                headers=headers
-            )
+            # Reuse a previous transcript of the same audio if we have one
+            trim = self.trim_silence.get()
+            cache_key = aai.cache_key(self.cache, audio_url, trim_silence=trim)
+            utterances = self.cache.get(cache_key) if cache_key else None
             
-            if response.status_code != 200:
-                raise Exception(f"API Error: {response.text}")
-                
-            transcript_id = response.json()['id']
-            polling_endpoint = f"https://api.assemblyai.com/v2/transcript/{transcript_id}"
-            
-            # Poll for results
-            while True:
-                polling_response = requests.get(polling_endpoint, headers=headers)
-                if polling_response.status_code != 200:
-                    raise Exception(f"API Error: {polling_response.text}")
-                    
-                status = polling_response.json()['status']
-                
-                if status == 'completed':
-                    break
-                elif status == 'error':
-                    raise Exception(polling_response.json().get('error', 'Unknown error'))
-                
-                time.sleep(3)
+            if utterances is None:
+                utterances = self.request_transcript(api_key, audio_url, trim)
+                if cache_key:
+                    self.cache.put(cache_key, utterances)
             
             # Format transcription with speaker labels and timestamps
-            transcription_text = ""
-            utterances = polling_response.json().get('utterances', [])
-            
-            # Create a mapping from speaker numbers to letters (0 -> A, 1 -> B, etc.)
-            speaker_mapping = {}
-            current_speaker_letter = ord('A')
-            
-            for utterance in utterances:
-                speaker_num = utterance['speaker']
-                
-                # If we haven't seen this speaker before, add them to the mapping
-                if speaker_num not in speaker_mapping:
-                    speaker_mapping[speaker_num] = chr(current_speaker_letter)
-                    current_speaker_letter += 1
-                    
-                speaker_label = f"Speaker {speaker_mapping[speaker_num]}"
-                
-                # Format timestamps (convert from milliseconds to seconds)
-                start_sec = utterance.get('start', 0) / 1000
-                end_sec = utterance.get('end', 0) / 1000
-                
-                # Format as [00:00:00 - 00:00:00]
-                start_time = time.strftime('%H:%M:%S', time.gmtime(start_sec))
-                end_time = time.strftime('%H:%M:%S', time.gmtime(end_sec))
-                
-                # Calculate duration
-                duration = end_sec - start_sec
-                
-                transcription_text += f"[{start_time} - {end_time}] {speaker_label} [Duration: {duration:.2f}s]:\n{utterance['text']}\n\n"
-            
-            self.transcription = transcription_text.strip()
+            self.transcription = aai.format_utterances(utterances)
             
             # Update UI
             self.root.after(0, lambda: self.text_input.delete("1.0", tk.END))
@@ -234,6 +244,22 @@ class TextSummarizerApp:
         finally:
             self.is_transcribing = False
     
+    def request_transcript(self, api_key, audio_url, trim=False):
+        # Keep one pooled session per API key instead of a new connection per request
+        if self.http is None or self.http_key != api_key:
+            self.http = aai.make_session(api_key)
+            self.http_key = api_key
+        offsets = None
+        if trim:
+            try:
+                audio_url, offsets = aai.upload_trimmed(self.http, audio_url)
+            except (OSError, subprocess.CalledProcessError) as e:
+                # No ffmpeg or undecodable source: let AssemblyAI fetch the original
+                logging.warning("Silence trimming skipped: %s", e)
+        transcript_id = aai.submit(self.http, audio_url)
+        utterances = aai.wait(self.http, transcript_id).get('utterances') or []
+        return aai.map_utterances(utterances, offsets) if offsets else utterances
+    
     def summarize_text(self):
         text = self.text_input.get("1.0", tk.END).strip()
         if not text:
@@ -245,21 +271,90 @@ class TextSummarizerApp:
             if sentence_count <= 0:
                 messagebox.showwarning("Input Error", "Number of sentences must be greater than 0.")
                 return
-                
-            parser = PlaintextParser.from_string(text, Tokenizer("english"))
-            summarizer = LsaSummarizer(Stemmer("english"))
-            summarizer.stop_words = get_stop_words("english")
+        except ValueError:
+            messagebox.showerror("Input Error", "Please enter a valid number of sentences.")
+            return
             
-            summary_sentences = summarizer(parser.document, sentence_count)
-            self.summary = " ".join(str(sentence) for sentence in summary_sentences)
+        if PlaintextParser is None and get_summarizer is None:
+            messagebox.showerror("Error", "No summarizer available: install sumy or numpy/scipy.")
+            return
+        
+        # Same text as before: re-slice the cached ranking, no SVD
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if key in self.rankings:
+            self.rankings.move_to_end(key)
+            self.show_summary(self.rankings[key], sentence_count)
+            return
+        
+        self.summary_job += 1
+        self.set_summarizing(True)
+        threading.Thread(target=self.rank_in_background, args=(self.summary_job, key, text, sentence_count),
+                         daemon=True).start()
+    
+    def rank_sentences(self, text):
+        """Rank every sentence once: returns (sentences, indices best first)."""
+        if PlaintextParser is not None:
+            parser = PlaintextParser.from_string(text, self.tokenizer)
+            sentences = [str(sentence) for sentence in parser.document.sentences]
+            ranked = []
             
-            self.summary_output.delete("1.0", tk.END)
-            self.summary_output.insert(tk.END, self.summary)
+            # sumy accepts a callable count; it receives every sentence sorted by rating
+            def keep_all(infos):
+                ranked.extend(infos)
+                return infos
             
-        except ValueError:
-            messagebox.showerror("Input Error", "Please enter a valid number of sentences.")
+            self.lsa(parser.document, keep_all)
+            return sentences, [info.order for info in ranked] or list(range(len(sentences)))
+        
+        document = get_summarizer("lsa").rank(text)
+        return document.sentences, [int(i) for i in document.order]
+    
+    def rank_in_background(self, job, key, text, sentence_count):
+        try:
+            ranking = self.rank_sentences(text)
         except Exception as e:
-            messagebox.showerror("Error", f"Summarization failed: {str(e)}")
+            error = str(e)
+            self.root.after(0, lambda: self.fail_summary(job, error))
+            return
+        self.root.after(0, lambda: self.finish_summary(job, key, ranking, sentence_count))
+    
+    def finish_summary(self, job, key, ranking, sentence_count):
+        # Cache even if cancelled; the work is done
+        self.rankings[key] = ranking
+        while len(self.rankings) > RANKING_CACHE_SIZE:
+            self.rankings.popitem(last=False)
+        if job != self.summary_job:
+            return
+        self.set_summarizing(False)
+        self.show_summary(ranking, sentence_count)
+    
+    def fail_summary(self, job, error):
+        if job != self.summary_job:
+            return
+        self.set_summarizing(False)
+        messagebox.showerror("Error", f"Summarization failed: {error}")
+    
+    def cancel_summary(self):
+        # The SVD can't be interrupted; its result is simply ignored when it arrives
+        self.summary_job += 1
+        self.set_summarizing(False)
+    
+    def set_summarizing(self, busy):
+        if busy:
+            self.summary_progress.grid()
+            self.summary_progress.start(10)
+            self.cancel_summary_button.grid()
+        else:
+            self.summary_progress.stop()
+            self.summary_progress.grid_remove()
+            self.cancel_summary_button.grid_remove()
+    
+    def show_summary(self, ranking, sentence_count):
+        sentences, order = ranking
+        chosen = sorted(order[:sentence_count])
+        self.summary = " ".join(sentences[i] for i in chosen)
+        self.summary_output.delete("1.0", tk.END)
+        self.summary_output.insert(tk.END, self.summary)
     
     def download_summary(self):
         if not self.summary:
@@ -286,12 +381,13 @@ class TextSummarizerApp:
             messagebox.showwarning("Question Required", "Please enter a question.")
             return
             
-        if not self.summary:
-            messagebox.showwarning("No Summary", "Please generate a summary first.")
+        text = self.text_input.get("1.0", tk.END).strip()
+        if not text:
+            messagebox.showwarning("No Transcript", "Please enter or transcribe some text first.")
             return
             
         # Simple Q&A implementation
-        answer = self.simple_qa(self.summary, question)
+        answer = self.simple_qa(text, question)
         
         self.answer_output.config(state=tk.NORMAL)
         self.answer_output.delete("1.0", tk.END)
@@ -300,65 +396,19 @@ class TextSummarizerApp:
     
     def simple_qa(self, text, question):
         """Simple question answering implementation"""
-        # Convert to lowercase for case-insensitive matching
-        text_lower = text.lower()
-        question_lower = question.lower()
-        
-        # Check for direct matches
-        if "who " in question_lower:
-            # Look for names or people references
-            sentences = nltk.sent_tokenize(text)
-            for sent in sentences:
-                if any(word in sent.lower() for word in ["mr.", "mrs.", "dr.", "professor"]):
-                    return sent
-                if any(word in sent.lower() for word in ["he", "she", "they"]):
-                    return sent
-            return "I couldn't find a specific person mentioned in the summary."
-        
-        elif "when " in question_lower:
-            # Look for time references
-            sentences = nltk.sent_tokenize(text)
-            for sent in sentences:
-                if any(word in sent.lower() for word in ["today", "yesterday", "tomorrow", "month", "year", "day"]):
-                    return sent
-                if any(word in sent.lower() for word in ["january", "february", "march", "april", "may", "june", 
-                                                       "july", "august", "september", "october", "november", "december"]):
-                    return sent
-            return "I couldn't find a specific time mentioned in the summary."
-        
-        elif "where " in question_lower:
-            # Look for location references
-            sentences = nltk.sent_tokenize(text)
-            for sent in sentences:
-                if any(word in sent.lower() for word in ["in ", "at ", "on ", "near ", "city", "country", "place"]):
-                    return sent
-            return "I couldn't find a specific location mentioned in the summary."
-        
-        else:
-            # Try to find a sentence that contains some question words
-            sentences = nltk.sent_tokenize(text)
-            question_words = set(question_lower.split())
-            
-            for sent in sentences:
-                sent_words = set(sent.lower().split())
-                if len(question_words & sent_words) > 2:  # At least 2 matching words
-                    return sent
-            
-            return "I couldn't find a specific answer in the summary. The summary content may not contain the information you're looking for."
+        # Only blocks that changed since the last question are re-indexed
+        self.qa_index.update(text)
+        passages = self.qa_index.search(question, QA_TOP_K)
+        if not passages:
+            return "I couldn't find a specific answer in the transcript. It may not contain the information you're looking for."
+        return "\n".join(str(passage) for passage in passages)
     
     def speak_summary(self):
         if not self.summary:
             messagebox.showwarning("No Summary", "Please generate a summary first.")
             return
             
-        if self.engine:
-            try:
-                self.engine.say(self.summary)
-                self.engine.runAndWait()
-            except Exception as e:
-                messagebox.showerror("TTS Error", f"Speech synthesis failed: {str(e)}")
-        else:
-            messagebox.showwarning("TTS Unavailable", "Text-to-speech engine is not available.")
+        self.speak(self.summary)
     
     def speak_transcription(self):
         text = self.text_input.get("1.0", tk.END).strip()
@@ -366,15 +416,34 @@ class TextSummarizerApp:
             messagebox.showwarning("No Text", "There is no text to speak.")
             return
             
-        if self.engine:
-            try:
-                self.engine.say(text)
-                self.engine.runAndWait()
-            except Exception as e:
-                messagebox.showerror("TTS Error", f"Speech synthesis failed: {str(e)}")
+        self.speak(text)
+    
+    def speak(self, text):
+        if self.speech:
+            self.speech.speak(text)
+            self.pause_speech_button.config(text="Pause")
         else:
             messagebox.showwarning("TTS Unavailable", "Text-to-speech engine is not available.")
     
+    def toggle_speech_pause(self):
+        if not self.speech:
+            return
+        if self.speech.paused:
+            self.speech.resume()
+            self.pause_speech_button.config(text="Pause")
+        else:
+            self.speech.pause()
+            self.pause_speech_button.config(text="Resume")
+    
+    def skip_speech(self):
+        if self.speech:
+            self.speech.skip()
+    
+    def stop_speech(self):
+        if self.speech:
+            self.speech.stop()
+            self.pause_speech_button.config(text="Pause")
+    
     def clear_input(self):
         self.text_input.delete("1.0", tk.END)
         self.url_entry.delete(0, tk.END)
@@ -390,4 +459,6 @@ class TextSummarizerApp:
 if __name__ == "__main__":
     root = tk.Tk()
     app = TextSummarizerApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    if app.speech:
+        app.speech.close()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import os
+import subprocess
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import backend_utils  # noqa: F401 (puts the backend's utils package on sys.path)
+
+API_URL = os.environ.get("ASSEMBLYAI_API_URL", "https://api.assemblyai.com/v2")
+
+# Adaptive polling: start fast for short clips, back off for long ones
+POLL_INITIAL = 1.0
+POLL_FACTOR = 1.5
+POLL_MAX = 30.0
+
+SAMPLE_RATE = 16000
+
+
+class TranscriptError(Exception):
+    """AssemblyAI reported the transcript itself as failed (status "error")."""
+
+
+def make_session(api_key, pool_size=10):
+    """A pooled session, so submits and polls reuse keep-alive connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=3)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"authorization": api_key, "content-type": "application/json"})
+    return session
+
+
+def submit(session, audio_url, speaker_labels=True):
+    response = session.post(f"{API_URL}/transcript", json={"audio_url": audio_url, "speaker_labels": speaker_labels})
+    if response.status_code != 200:
+        raise Exception(f"API Error: {response.text}")
+    return response.json()['id']
+
+
+def upload(session, data):
+    response = session.post(f"{API_URL}/upload", data=data, headers={"content-type": "application/octet-stream"})
+    if response.status_code != 200:
+        raise Exception(f"API Error: {response.text}")
+    return response.json()['upload_url']
+
+
+def load_audio(source):
+    """Decode any file or URL ffmpeg can read to 16 kHz mono float32."""
+    import numpy as np
+    pcm = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", source, "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"],
+        capture_output=True, check=True,
+    ).stdout
+    return np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def upload_trimmed(session, audio_url, max_silence=1.0):
+    """Upload the audio with long silences removed, so less is sent and billed.
+    Returns (upload_url, OffsetMap in seconds) for map_utterances."""
+    from utils.vad import trim_silence
+    audio, offsets, _ = trim_silence(load_audio(audio_url), SAMPLE_RATE, max_silence)
+    # Opus at 32 kbit/s (~14 MB/hour) rather than raw PCM (~115 MB/hour)
+    encoded = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-i", "-",
+         "-c:a", "libopus", "-b:a", "32k", "-f", "ogg", "-"],
+        input=(audio * 32767).astype("<i2").tobytes(), capture_output=True, check=True,
+    ).stdout
+    return upload(session, encoded), offsets
+
+
+def map_utterances(utterances, offsets):
+    """Move utterance (and word) timestamps from the trimmed upload back onto the
+    original recording."""
+    def mapped(item):
+        return dict(
+            item,
+            start=round(offsets.to_original(item.get('start', 0) / 1000) * 1000),
+            end=round(offsets.to_original(item.get('end', 0) / 1000, end=True) * 1000),
+        )
+    return [
+        dict(mapped(utterance), words=[mapped(word) for word in utterance.get('words') or []])
+        for utterance in utterances
+    ]
+
+
+def poll(session, transcript_id):
+    """One status check; returns the transcript JSON. Raises TranscriptError if the job
+    failed, anything else for a failed request (which may be worth retrying)."""
+    response = session.get(f"{API_URL}/transcript/{transcript_id}")
+    if response.status_code != 200:
+        raise Exception(f"API Error: {response.text}")
+    transcript = response.json()
+    if transcript['status'] == 'error':
+        raise TranscriptError(transcript.get('error', 'Unknown error'))
+    return transcript
+
+
+def wait(session, transcript_id):
+    delay = POLL_INITIAL
+    while True:
+        transcript = poll(session, transcript_id)
+        if transcript['status'] == 'completed':
+            return transcript
+        time.sleep(delay)
+        delay = min(delay * POLL_FACTOR, POLL_MAX)
+
+
+def cache_key(cache, audio_url, speaker_labels=True, trim_silence=False):
+    # Identify remote audio by its URL plus validators; without any we can't tell
+    # whether it changed, so don't cache
+    try:
+        head = requests.head(audio_url, allow_redirects=True, timeout=10)
+    except requests.RequestException:
+        return None
+    validators = {name: head.headers.get(name) for name in ("ETag", "Last-Modified", "Content-Length")}
+    if not (validators["ETag"] or validators["Last-Modified"]):
+        return None
+    options = {"trim_silence": True} if trim_silence else {}
+    return cache.key({"url": audio_url, **validators}, engine="assemblyai", speaker_labels=speaker_labels, **options)
+
+
+def format_utterances(utterances):
+    """Speaker-labelled, timestamped transcript text, one block per utterance."""
+    transcription_text = ""
+
+    # Create a mapping from speaker numbers to letters (0 -> A, 1 -> B, etc.)
+    speaker_mapping = {}
+    current_speaker_letter = ord('A')
+
+    for utterance in utterances:
+        speaker_num = utterance['speaker']
+
+        # If we haven't seen this speaker before, add them to the mapping
+        if speaker_num not in speaker_mapping:
+            speaker_mapping[speaker_num] = chr(current_speaker_letter)
+            current_speaker_letter += 1
+
+        speaker_label = f"Speaker {speaker_mapping[speaker_num]}"
+
+        # Format timestamps (convert from milliseconds to seconds)
+        start_sec = utterance.get('start', 0) / 1000
+        end_sec = utterance.get('end', 0) / 1000
+
+        # Format as [00:00:00 - 00:00:00]
+        start_time = time.strftime('%H:%M:%S', time.gmtime(start_sec))
+        end_time = time.strftime('%H:%M:%S', time.gmtime(end_sec))
+
+        # Calculate duration
+        duration = end_sec - start_sec
+
+        transcription_text += f"[{start_time} - {end_time}] {speaker_label} [Duration: {duration:.2f}s]:\n{utterance['text']}\n\n"
+
+    return transcription_text.strip()
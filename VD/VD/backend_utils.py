@@ -0,0 +1,16 @@
+"""Makes the FastAPI backend's utils package (transcript cache, VAD, summarizer)
+importable from this app. Import it before any `from utils... import ...`.
+
+The backend goes first on sys.path, so an unrelated `utils` package installed in
+site-packages can't shadow it.
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..",
+    "video transcription 4", "video transcription 4", "backend",
+))
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,154 @@
+"""Headless batch transcription through AssemblyAI.
+
+    python batch.py manifest.txt --out results --api-key KEY
+
+The manifest is a text file with one audio URL per line, a JSON list, or JSON
+lines; JSON entries may be plain URLs or {"url": ..., "name": ...} objects. Every
+job is submitted up front and polled with per-job backoff over one pooled
+session, so a batch takes about as long as its slowest recording. Each result is
+written as <name>.json (utterances) and <name>.txt (formatted transcript).
+"""
+import argparse
+import heapq
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import assemblyai_client as aai
+import backend_utils  # noqa: F401 (puts the backend's utils package on sys.path)
+from utils.cache import TranscriptCache
+
+MAX_POLL_ERRORS = 5  # consecutive failed status checks before a job is given up
+
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if path.endswith(".json"):
+        entries = json.loads(content)
+    elif path.endswith(".jsonl"):
+        entries = [json.loads(line) for line in content.splitlines() if line.strip()]
+    else:
+        entries = [line.strip() for line in content.splitlines() if line.strip() and not line.startswith("#")]
+
+    jobs = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        name = entry.get("name") or os.path.splitext(os.path.basename(entry["url"].split("?")[0]))[0]
+        # Prefix with the position so two recordings with the same file name can't collide
+        jobs.append({"url": entry["url"], "name": f"{index:04d}_{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}"})
+    return jobs
+
+
+def write_result(out_dir, job, utterances):
+    with open(os.path.join(out_dir, f"{job['name']}.json"), "w", encoding="utf-8") as f:
+        json.dump({"url": job["url"], "utterances": utterances}, f)
+    with open(os.path.join(out_dir, f"{job['name']}.txt"), "w", encoding="utf-8") as f:
+        f.write(aai.format_utterances(utterances))
+
+
+def run_batch(jobs, api_key, out_dir, concurrency=16, cache=None):
+    """Returns {job name: error message} for the jobs that failed."""
+    os.makedirs(out_dir, exist_ok=True)
+    session = aai.make_session(api_key, pool_size=concurrency)
+    failures = {}
+
+    def start(job):
+        # Cache hits are written immediately and need no transcript id
+        job["cache_key"] = aai.cache_key(cache, job["url"]) if cache else None
+        utterances = cache.get(job["cache_key"]) if job["cache_key"] else None
+        if utterances is not None:
+            write_result(out_dir, job, utterances)
+            return None
+        return aai.submit(session, job["url"])
+
+    def finish(job, transcript):
+        utterances = transcript.get('utterances') or []
+        if job["cache_key"]:
+            cache.put(job["cache_key"], utterances)
+        write_result(out_dir, job, utterances)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Heap of (next poll time, sequence, job, transcript id, current delay)
+        pending = []
+        started = {pool.submit(start, job): job for job in jobs}
+        for sequence, future in enumerate(as_completed(started)):
+            job = started[future]
+            try:
+                transcript_id = future.result()
+            except Exception as e:
+                failures[job["name"]] = str(e)
+                continue
+            if transcript_id is None:
+                logging.info("%s: cached", job["name"])
+                continue
+            job["id"] = transcript_id
+            heapq.heappush(pending, (time.monotonic() + aai.POLL_INITIAL, sequence, job, aai.POLL_INITIAL))
+
+        while pending:
+            now = time.monotonic()
+            if pending[0][0] > now:
+                time.sleep(pending[0][0] - now)
+                continue
+            due = []
+            while pending and pending[0][0] <= now:
+                due.append(heapq.heappop(pending))
+            polls = {pool.submit(aai.poll, session, entry[2]["id"]): entry for entry in due}
+            for future in as_completed(polls):
+                _, sequence, job, delay = polls[future]
+                try:
+                    transcript = future.result()
+                    job["poll_errors"] = 0
+                    if transcript['status'] == 'completed':
+                        finish(job, transcript)
+                        logging.info("%s: done", job["name"])
+                        continue
+                except aai.TranscriptError as e:
+                    failures[job["name"]] = str(e)
+                    logging.error("%s: %s", job["name"], e)
+                    continue
+                except Exception as e:
+                    # A 5xx or dropped connection says nothing about the job, which
+                    # AssemblyAI likely still finishes; check again after the backoff
+                    job["poll_errors"] = job.get("poll_errors", 0) + 1
+                    if job["poll_errors"] >= MAX_POLL_ERRORS:
+                        failures[job["name"]] = str(e)
+                        logging.error("%s: giving up after %d failed polls: %s", job["name"], job["poll_errors"], e)
+                        continue
+                    logging.warning("%s: poll failed, retrying: %s", job["name"], e)
+                delay = min(delay * aai.POLL_FACTOR, aai.POLL_MAX)
+                heapq.heappush(pending, (time.monotonic() + delay, sequence, job, delay))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe a batch of audio URLs with AssemblyAI.")
+    parser.add_argument("manifest", help="URL list (.txt), JSON list (.json) or JSON lines (.jsonl)")
+    parser.add_argument("--out", default="transcripts", help="output directory")
+    parser.add_argument("--api-key", default=os.environ.get("ASSEMBLYAI_API_KEY"),
+                        help="AssemblyAI API key (default: $ASSEMBLYAI_API_KEY)")
+    parser.add_argument("--concurrency", type=int, default=16, help="parallel HTTP requests")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the transcript cache")
+    args = parser.parse_args()
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or $ASSEMBLYAI_API_KEY)")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    jobs = load_manifest(args.manifest)
+    started = time.monotonic()
+    failures = run_batch(jobs, args.api_key, args.out, args.concurrency,
+                         cache=None if args.no_cache else TranscriptCache())
+    logging.info("%d/%d transcribed in %.1fs", len(jobs) - len(failures), len(jobs), time.monotonic() - started)
+    if failures:
+        with open(os.path.join(args.out, "failures.json"), "w", encoding="utf-8") as f:
+            json.dump(failures, f, indent=2)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
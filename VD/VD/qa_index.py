@@ -0,0 +1,129 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+import nltk
+from nltk.stem import PorterStemmer
+
+# Utterance headers written by TextSummarizerApp.transcribe_audio:
+# [00:00:01 - 00:00:05] Speaker A [Duration: 4.00s]:
+HEADER = re.compile(r"^\[(\d\d:\d\d:\d\d) - \d\d:\d\d:\d\d\] (.+?) \[Duration: [\d.]+s\]:\s*$", re.MULTILINE)
+WORD = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by did do does for from had has have how i in is it its of on or
+so that the their them they this to was we were what when where which who whom why will with
+you your about can could would should there here me my our us he she his her
+""".split())
+
+_stemmer = PorterStemmer()
+
+
+@lru_cache(maxsize=50000)
+def _stem(word):
+    return _stemmer.stem(word)
+
+
+def terms(text):
+    return [_stem(w) for w in WORD.findall(text.lower()) if w not in STOP_WORDS]
+
+
+class Passage:
+    def __init__(self, text, speaker=None, start=None):
+        self.text = text
+        self.speaker = speaker
+        self.start = start
+
+    def __str__(self):
+        prefix = f"[{self.start}] " if self.start else ""
+        speaker = f"{self.speaker}: " if self.speaker else ""
+        return f"{prefix}{speaker}{self.text}"
+
+
+class SentenceIndex:
+    """BM25 index over the sentences of a transcript.
+
+    The transcript is indexed per block (utterances are separated by blank lines).
+    update() only re-indexes the blocks after the first one that changed, so a
+    growing transcript costs one new block per refresh, and a query only touches
+    the postings of its own terms.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.source = None
+        self.blocks = []  # (block text, index of its first passage)
+        self.passages = []
+        self.passage_terms = []  # Counter per passage
+        self.lengths = []
+        self.postings = defaultdict(dict)  # term -> {passage id: term frequency}
+        self.total_length = 0
+
+    def update(self, text):
+        if text == self.source:
+            return
+        self.source = text
+        new_blocks = [block for block in re.split(r"\n\s*\n", text) if block.strip()]
+
+        keep = 0
+        while keep < min(len(self.blocks), len(new_blocks)) and self.blocks[keep][0] == new_blocks[keep]:
+            keep += 1
+        first = self.blocks[keep][1] if keep < len(self.blocks) else len(self.passages)
+        self._truncate(first)
+        del self.blocks[keep:]
+
+        for block in new_blocks[keep:]:
+            self.blocks.append((block, len(self.passages)))
+            for passage in self._parse_block(block):
+                self._add(passage)
+
+    def _parse_block(self, block):
+        speaker = start = None
+        header = HEADER.search(block)
+        if header:
+            start, speaker = header.group(1), header.group(2)
+            block = block[header.end():]
+        for sentence in nltk.sent_tokenize(block.strip()):
+            yield Passage(sentence, speaker, start)
+
+    def _add(self, passage):
+        passage_id = len(self.passages)
+        counts = Counter(terms(passage.text))
+        self.passages.append(passage)
+        self.passage_terms.append(counts)
+        self.lengths.append(sum(counts.values()))
+        self.total_length += self.lengths[-1]
+        for term, tf in counts.items():
+            self.postings[term][passage_id] = tf
+
+    def _truncate(self, first):
+        # Changed blocks are always a suffix, so their passages are the newest ids
+        for passage_id in range(first, len(self.passages)):
+            self.total_length -= self.lengths[passage_id]
+            for term in self.passage_terms[passage_id]:
+                del self.postings[term][passage_id]
+                if not self.postings[term]:
+                    del self.postings[term]
+        del self.passages[first:]
+        del self.passage_terms[first:]
+        del self.lengths[first:]
+
+    def search(self, question, k=3):
+        n = len(self.passages)
+        if not n:
+            return []
+        average_length = self.total_length / n or 1
+        scores = defaultdict(float)
+        for term in set(terms(question)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, tf in postings.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[passage_id] / average_length)
+                scores[passage_id] += idf * tf * (self.k1 + 1) / norm
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [self.passages[passage_id] for passage_id, _ in best]
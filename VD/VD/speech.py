@@ -0,0 +1,232 @@
+import hashlib
+import logging
+import os
+import queue
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import wave
+from collections import OrderedDict
+
+import pyttsx3
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+MAX_CHUNK_CHARS = 300  # longer sentences are split at commas/spaces so playback starts sooner
+
+# Command-line players tried in order; Windows uses winsound instead
+PLAYERS = (["afplay"], ["paplay"], ["aplay", "-q"])
+
+
+def split_sentences(text):
+    chunks = []
+    for sentence in SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        while len(sentence) > MAX_CHUNK_CHARS:
+            cut = max(sentence.rfind(", ", 0, MAX_CHUNK_CHARS), sentence.rfind(" ", 0, MAX_CHUNK_CHARS))
+            cut = cut + 1 if cut > 0 else MAX_CHUNK_CHARS
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            chunks.append(sentence)
+    return chunks
+
+
+class SpeechQueue:
+    """Speaks text sentence by sentence on a worker thread that owns the pyttsx3 engine.
+
+    Each sentence is rendered to a cached audio file with save_to_file and played by
+    a platform player, so the next sentence is rendered while the current one plays
+    and replaying the same text doesn't synthesize it again. Without a player (or if
+    rendering fails) sentences are spoken directly with say()/runAndWait().
+
+    pause() suspends the player (on Windows it takes effect at the next sentence),
+    skip() moves to the next sentence, stop() drops everything queued. When speaking
+    directly, skip() and stop() take effect at the next word.
+    """
+
+    def __init__(self, rate=150, cache_size=256):
+        self.rate = rate
+        self.cache_size = cache_size
+        self.cache_dir = tempfile.mkdtemp(prefix="toru-tts-")
+        self.rendered = OrderedDict()  # cache key -> file path, least recently used first
+        self.suffix = ".aiff" if sys.platform == "darwin" else ".wav"
+        self.player = None if sys.platform == "win32" else next(
+            (command for command in PLAYERS if shutil.which(command[0])), None)
+
+        self.requests = queue.Queue()
+        self.prefetched = None
+        self.generation = 0  # bumped by stop(); older queued sentences are dropped
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+        self.running.set()
+        self.interrupted = threading.Event()
+        self.speaking_directly = False  # only say() is cut short, not save_to_file renders
+        self.process = None
+
+        ready = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(ready,), name="speech", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def speak(self, text):
+        """Replace whatever is playing with `text`."""
+        self.stop()
+        with self.lock:
+            generation = self.generation
+        for sentence in split_sentences(text):
+            self.requests.put((generation, sentence))
+
+    def pause(self):
+        self.running.clear()
+        self._signal(getattr(signal, "SIGSTOP", None))
+
+    def resume(self):
+        self._signal(getattr(signal, "SIGCONT", None))
+        self.running.set()
+
+    @property
+    def paused(self):
+        return not self.running.is_set()
+
+    def skip(self):
+        self.interrupted.set()
+        self._terminate()
+
+    def stop(self):
+        with self.lock:
+            self.generation += 1
+        try:
+            while True:
+                self.requests.get_nowait()
+        except queue.Empty:
+            pass
+        self.resume()
+        self.skip()
+
+    def close(self):
+        self.stop()
+        self.requests.put((None, None))
+        self.thread.join(timeout=2)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _signal(self, sig):
+        process = self.process
+        if sig is not None and process is not None and process.poll() is None:
+            os.kill(process.pid, sig)
+
+    def _terminate(self):
+        process = self.process
+        if process is not None and process.poll() is None:
+            self._signal(getattr(signal, "SIGCONT", None))
+            process.terminate()
+
+    def _current(self, generation):
+        with self.lock:
+            return generation == self.generation
+
+    def _next(self):
+        if self.prefetched is not None:
+            item, self.prefetched = self.prefetched, None
+            return item
+        return self.requests.get()
+
+    def _run(self, ready):
+        try:
+            engine = pyttsx3.init()
+            engine.setProperty('rate', self.rate)
+            engine.connect('started-word', lambda **event: self._check_interrupted(engine))
+        except Exception as e:
+            self.error = e
+            return
+        finally:
+            ready.set()
+
+        while True:
+            generation, sentence = self._next()
+            if sentence is None:
+                break
+            self.running.wait()
+            if not self._current(generation):
+                continue
+            self.interrupted.clear()
+            path = self._render(engine, sentence) if self.player or sys.platform == "win32" else None
+            try:
+                if path is None:
+                    self.speaking_directly = True
+                    try:
+                        engine.say(sentence)
+                        engine.runAndWait()
+                    finally:
+                        self.speaking_directly = False
+                else:
+                    self._play(engine, path)
+            except Exception as e:
+                logging.warning("Speech playback failed: %s", e)
+
+    def _check_interrupted(self, engine):
+        # Runs inside runAndWait on the speech thread, the only place engine.stop() works
+        if self.speaking_directly and self.interrupted.is_set():
+            engine.stop()
+
+    def _render(self, engine, sentence):
+        key = hashlib.sha1(f"{self.rate}\0{sentence}".encode("utf-8")).hexdigest()
+        path = self.rendered.get(key)
+        if path is not None:
+            self.rendered.move_to_end(key)
+            return path
+        path = os.path.join(self.cache_dir, key + self.suffix)
+        try:
+            engine.save_to_file(sentence, path)
+            engine.runAndWait()
+        except Exception:
+            return None
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        self.rendered[key] = path
+        while len(self.rendered) > self.cache_size:
+            _, old = self.rendered.popitem(last=False)
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        return path
+
+    def _prefetch(self, engine):
+        # Render the next sentence while the current one plays
+        if self.prefetched is None:
+            try:
+                self.prefetched = self.requests.get_nowait()
+            except queue.Empty:
+                return
+        generation, sentence = self.prefetched
+        if sentence is not None and self._current(generation):
+            self._render(engine, sentence)
+
+    def _play(self, engine, path):
+        # skip()/stop() while the sentence was still rendering had no player to stop
+        if self.interrupted.is_set():
+            return
+        if sys.platform == "win32":
+            import winsound
+            with wave.open(path, "rb") as w:
+                duration = w.getnframes() / w.getframerate()
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+            self._prefetch(engine)
+            if self.interrupted.wait(duration):
+                winsound.PlaySound(None, 0)
+            return
+        self.process = subprocess.Popen(self.player + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if self.interrupted.is_set():
+            self._terminate()  # skipped between the check above and Popen
+        elif self.paused:
+            self._signal(getattr(signal, "SIGSTOP", None))
+        self._prefetch(engine)
+        self.process.wait()
+        self.process = None
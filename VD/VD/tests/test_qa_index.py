@@ -0,0 +1,71 @@
+import re
+
+import pytest
+
+import qa_index
+from qa_index import SentenceIndex
+
+TRANSCRIPT = """[00:00:01 - 00:00:05] Speaker A [Duration: 4.00s]:
+We moved the launch review to Thursday. Marketing owns the announcement.
+
+[00:00:06 - 00:00:09] Speaker B [Duration: 3.00s]:
+The budget for the contractor is still open. Finance will confirm it.
+
+[00:00:10 - 00:00:14] Speaker A [Duration: 4.00s]:
+Next meeting we review the hiring plan."""
+
+
+@pytest.fixture(autouse=True)
+def sentence_split(monkeypatch):
+    # Keep the tests independent of the punkt download; they cover the index, not nltk
+    monkeypatch.setattr(qa_index.nltk, "sent_tokenize", lambda text: re.split(r"(?<=[.!?])\s+", text))
+
+
+def snapshot(index):
+    postings = {term: dict(ids) for term, ids in index.postings.items()}
+    passages = [(p.text, p.speaker, p.start) for p in index.passages]
+    return passages, postings, index.lengths, index.total_length
+
+
+def test_update_matches_a_fresh_index_after_editing_a_middle_block():
+    edited = TRANSCRIPT.replace("still open", "approved at ten thousand")
+    index = SentenceIndex()
+    index.update(TRANSCRIPT)
+    index.update(edited)
+
+    fresh = SentenceIndex()
+    fresh.update(edited)
+    assert snapshot(index) == snapshot(fresh)
+    assert not index.search("still open")
+    assert index.search("contractor budget approved")[0].speaker == "Speaker B"
+
+
+def test_update_appending_a_block_keeps_earlier_passages():
+    index = SentenceIndex()
+    index.update(TRANSCRIPT)
+    first = index.passages[0]
+    index.update(TRANSCRIPT + "\n\n[00:00:15 - 00:00:17] Speaker B [Duration: 2.00s]:\nAgreed.")
+
+    assert index.passages[0] is first
+    assert index.passages[-1].text == "Agreed."
+    fresh = SentenceIndex()
+    fresh.update(index.source)
+    assert snapshot(index) == snapshot(fresh)
+
+
+def test_update_removing_blocks_drops_their_postings():
+    index = SentenceIndex()
+    index.update(TRANSCRIPT)
+    index.update(TRANSCRIPT.split("\n\n")[0])
+
+    assert len(index.passages) == 2
+    assert "budget" not in index.postings
+    assert index.total_length == sum(index.lengths)
+
+
+def test_search_returns_passages_with_speaker_and_time():
+    index = SentenceIndex()
+    index.update(TRANSCRIPT)
+    best = index.search("When is the launch review?", k=1)[0]
+    assert str(best) == "[00:00:01] Speaker A: We moved the launch review to Thursday."
+    assert SentenceIndex().search("anything") == []
@@ -1,128 +1,792 @@
-from flask import Flask, render_template, send_file, jsonify
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
 from flask_sock import Sock
+from simple_websocket import ConnectionClosed
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import LargeBinary, cast, event, func, inspect, text
+from sqlalchemy.engine import Engine
 import asyncio
 import websockets
 import threading
+from audio_pipeline import FRAME_MS, TARGET_RATE, open_pipeline
 import json
 import openai
 import logging
-import io
+import os
+import sys
+import re
+import sqlite3
+import zlib
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 
+# Shared helpers live in the FastAPI backend's utils package. It goes first on the
+# path so an unrelated `utils` package in site-packages can't shadow it.
+BACKEND_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..",
+                                            "video transcription 4", "video transcription 4", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+try:
+    # Local extractive summarizer, used when the OpenAI call fails
+    from utils.summarizer import generate_summary as local_summary
+except ImportError:
+    local_summary = None
+from utils import metrics
+from utils.vad import SilenceGate
+
 app = Flask(__name__)
 sock = Sock(app)
 
 # Config
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///meetings.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("DATABASE_URL", 'sqlite:///meetings.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # DB setup
 db = SQLAlchemy(app)
 
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets the download/listing readers run while the session writer commits.
+    # DATABASE_URL may point at another database, which has no PRAGMA.
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
 class Meeting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    transcript = db.Column(db.Text, nullable=False)
-    summary = db.Column(db.Text, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    ended_at = db.Column(db.DateTime)
+    summary = db.Column(db.Text, nullable=False, default="")
+    segments = db.relationship("Segment", backref="meeting", lazy="dynamic",
+                               order_by="Segment.start_ms", cascade="all, delete-orphan")
+
+    @property
+    def transcript(self):
+        return " ".join(text for (text,) in self.segments.with_entities(Segment.text))
+
+class Segment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    meeting_id = db.Column(db.Integer, db.ForeignKey("meeting.id", ondelete="CASCADE"), nullable=False)
+    start_ms = db.Column(db.Integer, nullable=False)
+    end_ms = db.Column(db.Integer, nullable=False)
+    speaker = db.Column(db.String(64))
+    text = db.Column(db.Text, nullable=False)
+
+    __table_args__ = (db.Index("ix_segment_meeting_start", "meeting_id", "start_ms"),)
+
+def migrate_legacy_meetings():
+    # Older databases stored one transcript blob per row; move each into a single segment
+    inspector = inspect(db.engine)
+    if "meeting" not in inspector.get_table_names():
+        return
+    if "transcript" not in {c["name"] for c in inspector.get_columns("meeting")}:
+        return
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE meeting RENAME TO meeting_legacy")
+    db.create_all()
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO meeting (id, started_at, summary) "
+            "SELECT id, CURRENT_TIMESTAMP, summary FROM meeting_legacy"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO segment (meeting_id, start_ms, end_ms, text) "
+            "SELECT id, 0, 0, transcript FROM meeting_legacy"
+        )
+        conn.exec_driver_sql("DROP TABLE meeting_legacy")
+    logging.info("Migrated legacy meeting rows to segments")
+
+# Full-text indexes over segment text and meeting summaries. They are external-content
+# FTS5 tables kept in sync by triggers, so every commit updates them incrementally.
+SEARCH_INDEXES = {
+    "segment_fts": ("segment", "text"),
+    "meeting_fts": ("meeting", "summary"),
+}
+
+def create_search_indexes():
+    with db.engine.begin() as conn:
+        existing = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for index, (table, column) in SEARCH_INDEXES.items():
+            conn.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+                f"{column}, content='{table}', content_rowid='id', tokenize='porter unicode61')"
+            )
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {index}(rowid, {column}) VALUES (new.id, new.{column}); END"
+            )
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {index}({index}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"
+            )
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+                f"INSERT INTO {index}({index}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+                f"INSERT INTO {index}(rowid, {column}) VALUES (new.id, new.{column}); END"
+            )
+            if index not in existing:
+                # New index over an existing database: backfill it once
+                conn.exec_driver_sql(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
 
 with app.app_context():
+    migrate_legacy_meetings()
     db.create_all()
+    try:
+        create_search_indexes()
+        search_enabled = True
+    except Exception as e:
+        logging.warning("Full-text search disabled, SQLite FTS5 unavailable: %s", str(e))
+        search_enabled = False
 
 # Replace with your API keys
-ASSEMBLYAI_API_KEY = "your_assemblyai_api_key"
-openai.api_key = "your_openai_api_key"
-ASSEMBLYAI_URL = "wss://api.assemblyai.com/v2/realtime/ws?sample_rate=16000"
+ASSEMBLYAI_API_KEY = os.environ.get("ASSEMBLYAI_API_KEY", "your_assemblyai_api_key")
+openai.api_key = os.environ.get("OPENAI_API_KEY", "your_openai_api_key")
+# Overridable so benchmarks/replay.py can point the app at local mocks
+openai.api_base = os.environ.get("OPENAI_API_BASE", openai.api_base)
+ASSEMBLYAI_URL = os.environ.get("ASSEMBLYAI_URL", "wss://api.assemblyai.com/v2/realtime/ws?sample_rate=16000")
+
+SUMMARY_EVERY = 5  # final transcripts between rolling summary updates
+FULL_PASS_CHUNK_CHARS = 12000  # transcript chunk size for the end-of-meeting summary
+LOCAL_SUMMARY_SENTENCES = 8  # length of the offline fallback summary
+SEGMENT_BATCH_SIZE = 20  # finals held in memory per session before they are inserted as one batch
+SEGMENT_FLUSH_SECONDS = 10  # ...or once the oldest buffered final is this old
+SESSION_IDLE_SECONDS = 15 * 60  # sessions without new audio/transcripts for this long are closed
+SESSION_RESUME_SECONDS = 30  # a disconnected session waits this long for the client to reconnect
+SUMMARY_WORKERS = 4  # concurrent LLM calls across all sessions
+CLOSE_WORKERS = 2  # meetings finalized (full-pass summary) at once
+SUMMARY_STALE_SECONDS = 20  # rolling summaries slower than this are not pushed to the browser
+
+MEETINGS_PAGE_SIZE = 50  # default (and maximum) page size for /meetings
+SEARCH_LIMIT = 20  # default (and maximum) hits per section for /search
+DOWNLOAD_BATCH_ROWS = 500  # segments fetched per round trip while streaming a download
+AUDIO_QUEUE_CHUNKS = 32  # audio chunks buffered per session before the browser socket is throttled
+UPSTREAM_QUEUE_FRAMES = 30  # normalized frames (FRAME_MS each) buffered in front of the AssemblyAI socket
+LIVE_VAD_MAX_SILENCE = float(os.environ.get("LIVE_VAD_MAX_SILENCE", 1.0))  # longer silences aren't sent (0 = send all)
+
+AUDIO_RECEIVE_SECONDS = metrics.histogram(
+    "live_audio_receive_seconds", "Time a browser audio chunk waits for room in its session queue")
+AUDIO_RECEIVED_BYTES = metrics.counter("live_audio_received_bytes_total", "Audio bytes received from browsers")
+UPSTREAM_SECONDS = metrics.histogram(
+    "live_upstream_round_trip_seconds", "Time from sending an audio frame upstream to the final transcript covering it")
+SILENCE_REMOVED = metrics.counter("live_audio_silence_removed_seconds_total", "Silent audio not sent upstream")
+FINALS = metrics.counter("live_final_transcripts_total", "Final transcripts received from AssemblyAI")
+LLM_SECONDS = metrics.histogram("llm_request_seconds", "OpenAI chat completion time")
+STALE_SUMMARIES = metrics.counter("live_stale_summaries_total", "Rolling summaries dropped as stale")
+DB_COMMIT_SECONDS = metrics.histogram("db_commit_seconds", "Database write time", labels=("operation",))
+
+# Optional sampling profiler at GET /debug/profile?seconds=N (collapsed stacks)
+PROFILER_ENABLED = os.environ.get("METRICS_PROFILER") == "1"
 
-transcript_buffer = []
+# LLM calls and DB writes run off the event loop; one DB writer keeps SQLite writes serialized
+summary_pool = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary")
+# End-of-meeting full passes are long; keep them from starving live rolling summaries
+close_pool = ThreadPoolExecutor(max_workers=CLOSE_WORKERS, thread_name_prefix="close")
+db_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
 
 @app.route("/")
 def index():
     return render_template("index.html")
 
+def segment_query(meeting_id, start_ms=None, end_ms=None, max_id=None):
+    query = Segment.query.filter(Segment.meeting_id == meeting_id)
+    if max_id is not None:
+        query = query.filter(Segment.id <= max_id)
+    if start_ms is not None:
+        query = query.filter(Segment.start_ms >= start_ms)
+    if end_ms is not None:
+        query = query.filter(Segment.start_ms < end_ms)
+    return query.order_by(Segment.start_ms)
+
+def transcript_stats(meeting_ids, start_ms=None, end_ms=None, max_id=None):
+    # Size of the rendered transcript without rendering it: every line is
+    # "[HH:MM:SS] " + optional "speaker: " + text, joined with newlines
+    query = db.session.query(
+        Segment.meeting_id,
+        func.count(Segment.id),
+        func.max(Segment.end_ms),
+        func.sum(func.length(cast(Segment.text, LargeBinary))),
+        func.sum(func.length(cast(Segment.speaker, LargeBinary)) + 2),
+    ).filter(Segment.meeting_id.in_(meeting_ids))
+    if max_id is not None:
+        query = query.filter(Segment.id <= max_id)
+    if start_ms is not None:
+        query = query.filter(Segment.start_ms >= start_ms)
+    if end_ms is not None:
+        query = query.filter(Segment.start_ms < end_ms)
+    stats = {}
+    for meeting_id, count, last_end_ms, text_bytes, speaker_bytes in query.group_by(Segment.meeting_id):
+        stats[meeting_id] = {
+            "segments": count,
+            "duration_seconds": (last_end_ms or 0) / 1000,
+            "bytes": count * 11 + (text_bytes or 0) + (speaker_bytes or 0) + count - 1,
+        }
+    return stats
+
 @app.route("/meetings")
 def list_meetings():
-    meetings = Meeting.query.all()
-    return jsonify([{"id": m.id} for m in meetings])
+    # Keyset pagination: ?after=<last id of the previous page>&limit=<n>
+    limit = max(1, min(request.args.get("limit", MEETINGS_PAGE_SIZE, type=int), MEETINGS_PAGE_SIZE))
+    query = db.session.query(Meeting.id, Meeting.started_at, Meeting.ended_at)
+    after = request.args.get("after", type=int)
+    if after is not None:
+        query = query.filter(Meeting.id > after)
+    rows = query.order_by(Meeting.id).limit(limit).all()
+    stats = transcript_stats([row.id for row in rows])
+    empty = {"segments": 0, "duration_seconds": 0, "bytes": 0}
+    meetings = [
+        {
+            "id": row.id,
+            "started_at": row.started_at.isoformat(),
+            "ended_at": row.ended_at.isoformat() if row.ended_at else None,
+            **stats.get(row.id, empty),
+        }
+        for row in rows
+    ]
+    return jsonify({"meetings": meetings, "next": rows[-1].id if len(rows) == limit else None})
+
+def match_expression(query):
+    # Quote every word so user input can't break FTS5 query syntax; words are ANDed
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+
+@app.route("/search")
+def search():
+    if not search_enabled:
+        return jsonify({"error": "Full-text search is not available"}), 501
+    match = match_expression(request.args.get("q", ""))
+    if not match:
+        return jsonify({"error": "Missing search query"}), 400
+    limit = max(1, min(request.args.get("limit", SEARCH_LIMIT, type=int), SEARCH_LIMIT))
+
+    segments = db.session.execute(text(
+        "SELECT s.meeting_id, s.start_ms, s.end_ms, s.speaker, "
+        "snippet(segment_fts, 0, '[', ']', '...', 16) AS snippet "
+        "FROM segment_fts JOIN segment s ON s.id = segment_fts.rowid "
+        "WHERE segment_fts MATCH :match ORDER BY segment_fts.rank LIMIT :limit"
+    ), {"match": match, "limit": limit})
+    summaries = db.session.execute(text(
+        "SELECT m.id AS meeting_id, m.started_at, "
+        "snippet(meeting_fts, 0, '[', ']', '...', 24) AS snippet "
+        "FROM meeting_fts JOIN meeting m ON m.id = meeting_fts.rowid "
+        "WHERE meeting_fts MATCH :match ORDER BY meeting_fts.rank LIMIT :limit"
+    ), {"match": match, "limit": limit})
+
+    return jsonify({
+        "segments": [
+            {
+                "meeting_id": row.meeting_id,
+                "start_seconds": row.start_ms / 1000,
+                "end_seconds": row.end_ms / 1000,
+                "timestamp": format_timestamp(row.start_ms),
+                "speaker": row.speaker,
+                "snippet": row.snippet,
+            }
+            for row in segments
+        ],
+        "summaries": [
+            {"meeting_id": row.meeting_id, "started_at": str(row.started_at), "snippet": row.snippet}
+            for row in summaries
+        ],
+    })
+
+def format_timestamp(ms):
+    return time.strftime("%H:%M:%S", time.gmtime(ms / 1000))
+
+def format_segment(segment):
+    speaker = f"{segment.speaker}: " if segment.speaker is not None else ""
+    return f"[{format_timestamp(segment.start_ms)}] {speaker}{segment.text}"
+
+def render_transcript(query):
+    first = True
+    for segment in query.yield_per(DOWNLOAD_BATCH_ROWS):
+        line = format_segment(segment)
+        yield (line if first else "\n" + line).encode("utf-8")
+        first = False
+
+def byte_range(chunks, start, stop):
+    # Pass through bytes [start, stop) of a stream of chunks
+    position = 0
+    for chunk in chunks:
+        if position + len(chunk) > start:
+            yield chunk[max(start - position, 0):stop - position]
+        position += len(chunk)
+        if position >= stop:
+            break
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
 
 @app.route("/download/<string:type>/<int:id>")
 def download(type, id):
     meeting = Meeting.query.get_or_404(id)
-    content = meeting.transcript if type == "transcript" else meeting.summary
-    filename = f"{type}_{id}.txt"
-    return send_file(
-        io.BytesIO(content.encode("utf-8")),
-        mimetype="text/plain",
-        as_attachment=True,
-        download_name=filename
-    )
+    if type == "transcript":
+        # Optional ?start=&end= (seconds) to download a slice of the meeting
+        start = request.args.get("start", type=float)
+        end = request.args.get("end", type=float)
+        start_ms = int(start * 1000) if start is not None else None
+        end_ms = int(end * 1000) if end is not None else None
+        # A live meeting keeps getting segments; size and body both cover only the
+        # segments that exist now, so Content-Length and byte ranges stay consistent
+        max_id = db.session.query(func.max(Segment.id)).filter(Segment.meeting_id == id).scalar() or 0
+        size = transcript_stats([id], start_ms, end_ms, max_id).get(id, {"bytes": 0})["bytes"]
+        chunks = render_transcript(segment_query(id, start_ms, end_ms, max_id))
+    else:
+        body = meeting.summary.encode("utf-8")
+        size = len(body)
+        chunks = iter([body])
 
-def generate_summary(text):
-    prompt = (
-        "You are an AI meeting assistant. Summarize this transcript into bullet points with key takeaways and action items:\n\n"
-        f"{text}\n\nSummary:"
-    )
-    try:
+    status = 200
+    headers = {"Content-Disposition": f"attachment; filename={type}_{id}.txt", "Accept-Ranges": "bytes"}
+    if request.range and len(request.range.ranges) == 1:
+        bounds = request.range.range_for_length(size)
+        if bounds is None:
+            return Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+        start_byte, stop_byte = bounds
+        chunks = byte_range(chunks, start_byte, stop_byte)
+        status = 206
+        headers["Content-Range"] = f"bytes {start_byte}-{stop_byte - 1}/{size}"
+        headers["Content-Length"] = str(stop_byte - start_byte)
+    elif request.accept_encodings["gzip"]:
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    else:
+        headers["Content-Length"] = str(size)
+    return Response(stream_with_context(chunks), status=status, mimetype="text/plain", headers=headers)
+
+def _chat(prompt):
+    with LLM_SECONDS.time():
         response = openai.ChatCompletion.create(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.5,
             max_tokens=300
         )
-        summary = response.choices[0].message["content"]
+    return response.choices[0].message["content"]
+
+def update_summary(previous_summary, new_text):
+    # Rolling update: only the utterances since the last update go to the LLM,
+    # so the prompt stays roughly the same size however long the meeting runs
+    prompt = (
+        "You are an AI meeting assistant. Here is the running summary of a meeting so far:\n\n"
+        f"{previous_summary or '(no summary yet)'}\n\n"
+        "Update it with the new transcript lines below. Keep it as bullet points with key takeaways "
+        "and action items, merge duplicates and drop nothing important:\n\n"
+        f"{new_text}\n\nUpdated summary:"
+    )
+    try:
+        return _chat(prompt)
+    except Exception as e:
+        logging.error("OpenAI summary update error: %s", str(e))
+        if local_summary:
+            return local_summary(f"{previous_summary}\n\n{new_text}", LOCAL_SUMMARY_SENTENCES)
+        return previous_summary or "Summary generation failed."
 
-        meeting = Meeting(transcript=text, summary=summary)
-        db.session.add(meeting)
-        db.session.commit()
+def _split_chunks(text, size):
+    words = text.split()
+    chunk, length = [], 0
+    for word in words:
+        if length + len(word) > size and chunk:
+            yield " ".join(chunk)
+            chunk, length = [], 0
+        chunk.append(word)
+        length += len(word) + 1
+    if chunk:
+        yield " ".join(chunk)
 
-        return summary
+def generate_summary(text):
+    prompt = (
+        "You are an AI meeting assistant. Summarize this transcript into bullet points with key takeaways and action items:\n\n"
+        "{}\n\nSummary:"
+    )
+    try:
+        chunks = list(_split_chunks(text, FULL_PASS_CHUNK_CHARS))
+        if len(chunks) > 1:
+            # Too long for one prompt: summarize each chunk, then summarize the summaries
+            partials = [_chat(prompt.format(chunk)) for chunk in chunks]
+            return _chat(prompt.format("\n\n".join(partials)))
+        return _chat(prompt.format(text))
     except Exception as e:
         logging.error("OpenAI summary error: %s", str(e))
+        if local_summary:
+            return local_summary(text, LOCAL_SUMMARY_SENTENCES)
         return "Summary generation failed."
 
-@sock.route("/transcribe")
-def transcribe(ws):
-    async def run():
-        logging.info("Transcription WebSocket connected")
+
+class MeetingSession:
+    def __init__(self, session_id):
+        self.id = session_id
+        self.meeting_id = None
+        self.started_at = datetime.utcnow()
+        self.lines = []  # segments not yet inserted
+        self.flushed_at = time.monotonic()
+        # Upstream timestamps restart at 0 on every connection; a resumed connection's
+        # audio starts where the previous connections' audio ended
+        self.audio_ms = 0  # audio received over all connections
+        self.offset_ms = 0  # meeting time at which the current connection's audio starts
+        self.new_lines = []  # finals not yet folded into the rolling summary
+        self.summary = ""
+        self.summary_task = None
+        self.closed = False
+        self.last_active = time.monotonic()
+        self.connected = False  # one live /transcribe connection at a time
+        self.audio = None  # queues of the live connection, read by the metrics gauges
+        self.frames = None
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+class SessionManager:
+    """Per-meeting transcript state, so concurrent /transcribe connections don't mix.
+
+    A session outlives its connection by resume_seconds: a client that reconnects
+    with ?session=<id> in that time continues the same meeting. Only then (or after
+    idle_seconds without activity) is the meeting finalized.
+    """
+
+    def __init__(self, batch_size, flush_seconds, idle_seconds, resume_seconds):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.idle_seconds = idle_seconds
+        self.resume_seconds = resume_seconds
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def open(self, session_id=None):
+        """Attach a connection; None if the session already has one."""
+        session_id = session_id or uuid.uuid4().hex
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = MeetingSession(session_id)
+            elif session.connected:
+                return None
+            session.connected = True
+            session.touch()
+            return session
+
+    def detach(self, session):
+        with self.lock:
+            session.connected = False
+            session.audio = session.frames = None
+            session.touch()
+
+    def add_final(self, session, text, start_ms=0, end_ms=0, speaker=None):
+        # Returns a batch of segments once one is due; the caller inserts it off-loop
+        start_ms += session.offset_ms
+        end_ms += session.offset_ms
+        session.lines.append({"start_ms": start_ms, "end_ms": end_ms, "speaker": speaker or None, "text": text})
+        session.new_lines.append(text)
+        session.touch()
+        if (len(session.lines) >= self.batch_size
+                or time.monotonic() - session.flushed_at >= self.flush_seconds):
+            return self.take_batch(session)
+        return None
+
+    def take_batch(self, session):
+        batch, session.lines = session.lines, []
+        session.flushed_at = time.monotonic()
+        return batch
+
+    def write(self, session, batch):
+        if not batch:
+            return
+        with app.app_context():
+            created = session.meeting_id is None
+            try:
+                if created:
+                    meeting = Meeting(started_at=session.started_at, summary=session.summary)
+                    db.session.add(meeting)
+                    db.session.flush()
+                    session.meeting_id = meeting.id
+                else:
+                    db.session.get(Meeting, session.meeting_id).summary = session.summary
+                db.session.execute(
+                    db.insert(Segment),
+                    [dict(row, meeting_id=session.meeting_id) for row in batch]
+                )
+                with DB_COMMIT_SECONDS.time(operation="segments"):
+                    db.session.commit()
+            except Exception:
+                # The meeting row was rolled back too, so a retry must create it again
+                db.session.rollback()
+                if created:
+                    session.meeting_id = None
+                raise
+
+    def load_transcript(self, session):
+        with app.app_context():
+            return db.session.get(Meeting, session.meeting_id).transcript
+
+    def save_summary(self, session, summary):
+        with app.app_context():
+            meeting = db.session.get(Meeting, session.meeting_id)
+            meeting.summary = summary
+            meeting.ended_at = datetime.utcnow()
+            with DB_COMMIT_SECONDS.time(operation="summary"):
+                db.session.commit()
+
+    def close(self, session):
+        # Only called once the session is out of self.sessions, so no connection can attach
+        if session.closed:
+            return
+        session.closed = True
         try:
-            async with websockets.connect(
-                ASSEMBLYAI_URL,
-                extra_headers={"Authorization": ASSEMBLYAI_API_KEY}
-            ) as aai_ws:
+            db_pool.submit(self.write, session, self.take_batch(session)).result()
+            if session.meeting_id is None:
+                return
+            # Meeting over: one full pass over the whole transcript for the stored summary
+            transcript = db_pool.submit(self.load_transcript, session).result()
+            summary = generate_summary(transcript)
+            db_pool.submit(self.save_summary, session, summary).result()
+        except Exception:
+            logging.exception("Failed to finalize session %s", session.id)
+            return
+        logging.info("Session %s closed, saved as meeting %s", session.id, session.meeting_id)
+
+    def evict_idle(self):
+        now = time.monotonic()
+        with self.lock:
+            expired = [
+                s for s in self.sessions.values()
+                if now - s.last_active > (self.idle_seconds if s.connected else self.resume_seconds)
+            ]
+            for session in expired:
+                del self.sessions[session.id]
+        for session in expired:
+            logging.info("Closing session %s (%s)", session.id, "idle" if session.connected else "disconnected")
+            close_pool.submit(self.close, session)
+
+sessions = SessionManager(SEGMENT_BATCH_SIZE, SEGMENT_FLUSH_SECONDS, SESSION_IDLE_SECONDS, SESSION_RESUME_SECONDS)
+
+def live_sessions():
+    with sessions.lock:
+        return list(sessions.sessions.values())
+
+metrics.gauge("live_sessions", "Open transcription sessions").set_function(lambda: len(live_sessions()))
+metrics.gauge("live_audio_queue_chunks", "Browser audio chunks queued across sessions").set_function(
+    lambda: sum(s.audio.qsize() for s in live_sessions() if s.audio is not None))
+metrics.gauge("live_upstream_queue_frames", "Normalized frames queued for AssemblyAI across sessions").set_function(
+    lambda: sum(s.frames.qsize() for s in live_sessions() if s.frames is not None))
+metrics.gauge("live_buffered_segments", "Final transcripts held in memory before insert").set_function(
+    lambda: sum(len(s.lines) for s in live_sessions()))
+
+def reap_idle_sessions():
+    while True:
+        time.sleep(min(60, SESSION_RESUME_SECONDS / 3))
+        sessions.evict_idle()
+
+threading.Thread(target=reap_idle_sessions, daemon=True).start()
+
+# One long-lived event loop multiplexes the upstream AssemblyAI sockets of every session
+event_loop = asyncio.new_event_loop()
+threading.Thread(target=event_loop.run_forever, name="transcribe-loop", daemon=True).start()
+
+async def relay_session(ws, session, audio):
+    loop = asyncio.get_running_loop()
 
-                await aai_ws.send(json.dumps({"type": "start", "sample_rate": 16000}))
+    async def send_json(payload):
+        # flask-sock sends block on the browser socket, so keep them off the shared loop
+        await loop.run_in_executor(None, ws.send, json.dumps(payload))
 
-                async def send_audio():
+    logging.info("Transcription WebSocket connected (session %s)", session.id)
+    session.offset_ms = session.audio_ms
+    try:
+        # The client reconnects with ?session=<id> to resume this meeting
+        await send_json({"session": session.id})
+        async with websockets.connect(
+            ASSEMBLYAI_URL,
+            extra_headers={"Authorization": ASSEMBLYAI_API_KEY}
+        ) as aai_ws:
+
+            await aai_ws.send(json.dumps({"type": "start", "sample_rate": TARGET_RATE}))
+            frames = session.frames = asyncio.Queue(maxsize=UPSTREAM_QUEUE_FRAMES)
+            sent = deque()  # (audio ms sent so far, perf_counter at send), for the round trip
+            # Upstream timestamps count only the audio actually sent; gate.offsets maps them back
+            gate = SilenceGate(FRAME_MS, LIVE_VAD_MAX_SILENCE) if LIVE_VAD_MAX_SILENCE > 0 else None
+
+            async def normalize_audio():
+                # Browser audio -> 16 kHz mono PCM16 in fixed FRAME_MS packets. A full
+                # frames queue stalls this loop, which in turn throttles the browser.
+                pipeline = None
+                try:
                     while True:
-                        data = ws.receive()
+                        data = await audio.get()
                         if data is None:
                             break
-                        await aai_ws.send(data)
+                        if pipeline is None:
+                            pipeline, consumed = await open_pipeline(data, frames)
+                            if consumed:
+                                continue
+                        await pipeline.feed(data)
+                    if pipeline is not None:
+                        await pipeline.close()
+                except BaseException:
+                    if pipeline is not None:
+                        pipeline.abort()
+                    raise
+                await frames.put(None)
 
-                async def receive_transcripts():
-                    while True:
-                        message = await aai_ws.recv()
-                        msg = json.loads(message)
-                        if msg.get("message_type") == "FinalTranscript":
-                            text = msg["text"]
-                            if text.strip():
-                                transcript_buffer.append(text)
-                                logging.info("Transcript: %s", text)
-                                ws.send(json.dumps({"text": text}))
-
-                                if len(transcript_buffer) % 5 == 0:
-                                    full_text = " ".join(transcript_buffer)
-                                    summary = generate_summary(full_text)
-                                    ws.send(json.dumps({"summary": summary}))
-
-                await asyncio.gather(send_audio(), receive_transcripts())
-
-        except Exception as e:
-            logging.error("Transcription error: %s", str(e))
-            ws.send(json.dumps({"error": str(e)}))
-
-    threading.Thread(target=asyncio.run, args=(run(),)).start()
+            async def send_audio():
+                while True:
+                    frame = await frames.get()
+                    if frame is None:
+                        break
+                    session.audio_ms += FRAME_MS
+                    if gate is None:
+                        outgoing = [frame]
+                    else:
+                        removed_ms = gate.removed_ms
+                        outgoing = gate.accept(frame)
+                        SILENCE_REMOVED.inc((gate.removed_ms - removed_ms) / 1000)
+                    for frame in outgoing:
+                        await aai_ws.send(frame)
+                        sent.append(((sent[-1][0] if sent else 0) + FRAME_MS, time.perf_counter()))
+                await aai_ws.close()
+
+            def write_batch(batch):
+                def written(future):
+                    error = future.exception()
+                    if error is None:
+                        return
+                    if session.closed:
+                        logging.error("Lost %d segments of session %s: %s", len(batch), session.id, error)
+                    else:
+                        # Put them back in front; the next batch retries the insert
+                        logging.error("Segment insert failed for session %s, will retry: %s", session.id, error)
+                        session.lines[:0] = batch
+
+                loop.run_in_executor(db_pool, sessions.write, session, batch).add_done_callback(written)
+
+            def request_summary():
+                # Coalesce: while an update is in flight, new finals just accumulate
+                # and are folded in by the follow-up run when it finishes
+                if session.summary_task is None or session.summary_task.done():
+                    session.summary_task = asyncio.ensure_future(run_summary())
+
+            async def run_summary():
+                lines, session.new_lines = session.new_lines, []
+                started = time.monotonic()
+                session.summary = await loop.run_in_executor(
+                    summary_pool, update_summary, session.summary, " ".join(lines)
+                )
+                if time.monotonic() - started <= SUMMARY_STALE_SECONDS:
+                    await send_json({"summary": session.summary})
+                else:
+                    STALE_SUMMARIES.inc()
+                    logging.info("Dropping stale summary for session %s", session.id)
+                if len(session.new_lines) >= SUMMARY_EVERY and not session.closed:
+                    session.summary_task = asyncio.ensure_future(run_summary())
+
+            async def receive_transcripts():
+                async for message in aai_ws:
+                    msg = json.loads(message)
+                    if msg.get("message_type") == "FinalTranscript":
+                        FINALS.inc()
+                        covered = None
+                        while sent and sent[0][0] <= msg.get("audio_end", 0):
+                            covered = sent.popleft()
+                        if covered:
+                            UPSTREAM_SECONDS.observe(time.perf_counter() - covered[1])
+                        text = msg["text"]
+                        if text.strip():
+                            start_ms, end_ms = msg.get("audio_start", 0), msg.get("audio_end", 0)
+                            if gate is not None:
+                                start_ms = gate.offsets.to_original(start_ms)
+                                end_ms = gate.offsets.to_original(end_ms, end=True)
+                            batch = sessions.add_final(session, text, start_ms, end_ms, msg.get("speaker"))
+                            logging.info("Transcript: %s", text)
+                            await send_json({"text": text})
+
+                            if batch:
+                                write_batch(batch)
+                            if len(session.new_lines) >= SUMMARY_EVERY:
+                                request_summary()
+
+            tasks = [asyncio.ensure_future(c) for c in (normalize_audio(), send_audio(), receive_transcripts())]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                # If one side fails, don't leave the others waiting on a dead queue
+                for task in tasks:
+                    task.cancel()
+
+    except Exception as e:
+        logging.error("Transcription error: %s", str(e))
+        try:
+            await send_json({"error": str(e)})
+        except ConnectionClosed:
+            pass
+    finally:
+        if session.summary_task is not None:
+            session.summary_task.cancel()
+        # Finalized by evict_idle unless the client reconnects within SESSION_RESUME_SECONDS
+        sessions.detach(session)
+
+@sock.route("/transcribe")
+def transcribe(ws):
+    session = sessions.open(request.args.get("session"))
+    if session is None:
+        ws.send(json.dumps({"error": "Session already has a live connection"}))
+        return
+    audio = session.audio = asyncio.Queue(maxsize=AUDIO_QUEUE_CHUNKS)
+    relay = asyncio.run_coroutine_threadsafe(relay_session(ws, session, audio), event_loop)
+
+    # Bridge the blocking flask-sock receive into the shared loop. Waiting on put()
+    # throttles the browser when upstream falls behind (backpressure).
+    try:
+        while not relay.done() and not session.closed:
+            data = ws.receive(timeout=1)
+            if data is None:
+                continue
+            session.touch()
+            AUDIO_RECEIVED_BYTES.inc(len(data))
+            received = time.perf_counter()
+            put = asyncio.run_coroutine_threadsafe(audio.put(data), event_loop)
+            while not relay.done():
+                try:
+                    put.result(timeout=1)
+                    AUDIO_RECEIVE_SECONDS.observe(time.perf_counter() - received)
+                    break
+                except FutureTimeoutError:
+                    continue
+            else:
+                put.cancel()
+    except ConnectionClosed:
+        pass
+    finally:
+        # The sentinel waits for room behind the audio already queued; if the relay
+        # finishes first there is no one left to read it
+        if not relay.done():
+            end = asyncio.run_coroutine_threadsafe(audio.put(None), event_loop)
+            relay.add_done_callback(lambda _: end.cancel())
+
+    # Returning closes the browser socket, so wait until upstream is shut down
+    relay.result()
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route("/debug/profile")
+def profile():
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profiler is disabled, set METRICS_PROFILER=1"}), 404
+    seconds = min(request.args.get("seconds", 10.0, type=float), 60.0)
+    return Response(metrics.sample_stacks(seconds), mimetype="text/plain")
 
 if __name__ == "__main__":
     app.run(debug=True)
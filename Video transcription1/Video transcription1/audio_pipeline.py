@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+
+import numpy as np
+
+TARGET_RATE = 16000  # AssemblyAI realtime expects 16 kHz mono PCM16
+FRAME_MS = 100
+FRAME_BYTES = TARGET_RATE * FRAME_MS // 1000 * 2
+
+
+class Resampler:
+    """Streaming float32 -> 16 kHz resampler.
+
+    A boxcar low-pass (one tap per source sample in an output period) followed by
+    linear interpolation, both vectorized; filter history and the fractional read
+    position carry over between chunks, so chunk boundaries don't click.
+    """
+
+    def __init__(self, source_rate, target_rate=TARGET_RATE):
+        self.step = source_rate / target_rate
+        taps = max(int(round(self.step)), 1)
+        self.kernel = np.full(taps, 1.0 / taps, dtype=np.float32)
+        self.tail = np.zeros(taps - 1, dtype=np.float32)
+        self.carry = np.zeros(0, dtype=np.float32)
+        self.position = 0.0
+
+    def process(self, samples):
+        if len(self.kernel) > 1:
+            padded = np.concatenate([self.tail, samples])
+            samples = np.convolve(padded, self.kernel, mode="valid")
+            self.tail = padded[len(padded) - len(self.tail):]
+        if self.step == 1:
+            return samples
+        buffer = np.concatenate([self.carry, samples])
+        if len(buffer) < 2:
+            self.carry = buffer
+            return np.zeros(0, dtype=np.float32)
+        positions = np.arange(self.position, len(buffer) - 1, self.step)
+        out = np.interp(positions, np.arange(len(buffer)), buffer).astype(np.float32)
+        next_position = positions[-1] + self.step if len(positions) else self.position
+        # Keep the last sample; its index becomes 0 in the next buffer
+        self.position = next_position - (len(buffer) - 1)
+        self.carry = buffer[-1:]
+        return out
+
+
+def to_pcm16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class Reframer:
+    """Re-chunks a byte stream into fixed-size packets."""
+
+    def __init__(self, frame_bytes=FRAME_BYTES):
+        self.frame_bytes = frame_bytes
+        self.buffer = bytearray()
+
+    def push(self, data):
+        self.buffer += data
+        frames = []
+        while len(self.buffer) >= self.frame_bytes:
+            frames.append(bytes(self.buffer[:self.frame_bytes]))
+            del self.buffer[:self.frame_bytes]
+        return frames
+
+    def flush(self):
+        # Zero-pad the last partial frame so upstream only ever sees full frames
+        if not self.buffer:
+            return []
+        frame = bytes(self.buffer) + bytes(self.frame_bytes - len(self.buffer))
+        self.buffer.clear()
+        return [frame]
+
+
+class PcmPipeline:
+    """Raw PCM from the browser (AudioContext), resampled with NumPy.
+
+    s16le at 16 kHz (what the page's AudioWorklet sends) is already in the upstream
+    format and is only re-framed; float32 or other rates are converted first.
+    """
+
+    def __init__(self, sample_rate, frames, sample_format="f32le"):
+        self.sample_format = sample_format
+        self.passthrough = sample_format == "s16le" and sample_rate == TARGET_RATE
+        self.resampler = Resampler(sample_rate)
+        self.reframer = Reframer()
+        self.frames = frames
+
+    async def start(self):
+        pass
+
+    async def feed(self, data):
+        if self.passthrough:
+            pcm = data
+        elif self.sample_format == "s16le":
+            samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768
+            pcm = to_pcm16(self.resampler.process(samples))
+        else:
+            pcm = to_pcm16(self.resampler.process(np.frombuffer(data, dtype="<f4")))
+        for frame in self.reframer.push(pcm):
+            await self.frames.put(frame)
+
+    async def close(self):
+        for frame in self.reframer.flush():
+            await self.frames.put(frame)
+
+    def abort(self):
+        pass
+
+
+class FfmpegPipeline:
+    """Compressed audio (MediaRecorder WebM/Opus) decoded by a streaming ffmpeg."""
+
+    def __init__(self, frames):
+        self.reframer = Reframer()
+        self.frames = frames
+        self.process = None
+        self.reader = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-loglevel", "error", "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(TARGET_RATE), "pipe:1",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        )
+        self.reader = asyncio.ensure_future(self._read())
+
+    async def _read(self):
+        while True:
+            data = await self.process.stdout.read(FRAME_BYTES)
+            if not data:
+                break
+            for frame in self.reframer.push(data):
+                await self.frames.put(frame)
+
+    async def feed(self, data):
+        self.process.stdin.write(data)
+        await self.process.stdin.drain()
+
+    async def close(self):
+        self.process.stdin.close()
+        await self.reader
+        await self.process.wait()
+        for frame in self.reframer.flush():
+            await self.frames.put(frame)
+
+    def abort(self):
+        if self.reader is not None:
+            self.reader.cancel()
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+
+
+async def open_pipeline(first_message, frames):
+    """Pick the pipeline from the first browser message. Current clients start with a
+    JSON config ({"format": "s16le" or "f32le", "sample_rate": 16000}); anything else
+    is treated as compressed audio for ffmpeg. Returns (pipeline, consumed_first_message)."""
+    if isinstance(first_message, str):
+        config = json.loads(first_message)
+        if config.get("format") in ("s16le", "f32le"):
+            pipeline = PcmPipeline(int(config["sample_rate"]), frames, config["format"])
+            await pipeline.start()
+            return pipeline, True
+        logging.warning("Unknown audio config %s, falling back to ffmpeg", config)
+    pipeline = FfmpegPipeline(frames)
+    await pipeline.start()
+    return pipeline, isinstance(first_message, str)
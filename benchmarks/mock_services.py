@@ -0,0 +1,170 @@
+"""Local stand-ins for AssemblyAI and OpenAI used by replay.py.
+
+Every scripted transcript carries a token (m<meeting>-<n>) and the time it was
+emitted is recorded in EMITTED, so the harness can measure how long it takes to
+reach the browser. The chat stub answers with the newest token it was shown.
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import websockets
+
+TOKEN = re.compile(r"\bm(\d+)-(\d+)\b")
+BYTES_PER_MS = 32  # 16 kHz mono PCM16
+
+FILLER = (
+    "We reviewed the release plan and agreed to move the launch review to Thursday. "
+    "The team will follow up on the open budget questions before the next meeting."
+)
+
+EMITTED = {}  # token -> perf_counter() when the final transcript was sent
+_emitted_lock = threading.Lock()
+
+
+def emitted_at(token):
+    with _emitted_lock:
+        return EMITTED.get(token)
+
+
+def newest_token(text):
+    tokens = [(int(m), int(n)) for m, n in TOKEN.findall(text)]
+    if not tokens:
+        return None
+    meeting, n = max(tokens, key=lambda token: token[1])
+    return f"m{meeting}-{n}"
+
+
+class RealtimeServer:
+    """Realtime websocket: one FinalTranscript per `utterance_ms` of audio received."""
+
+    def __init__(self, utterance_ms=2000, host="127.0.0.1", port=0):
+        self.utterance_ms = utterance_ms
+        self.host = host
+        self.port = port
+        self.loop = asyncio.new_event_loop()
+        self.connections = 0
+        self.audio_bytes = 0
+
+    async def handle(self, ws, path=None):
+        meeting = self.connections
+        self.connections += 1
+        received = 0
+        sent = 0
+        async for message in ws:
+            if isinstance(message, str):
+                continue  # session start
+            received += len(message)
+            self.audio_bytes += len(message)
+            while (received // BYTES_PER_MS) // self.utterance_ms > sent:
+                token = f"m{meeting}-{sent}"
+                with _emitted_lock:
+                    EMITTED[token] = time.perf_counter()
+                await ws.send(json.dumps({
+                    "message_type": "FinalTranscript",
+                    "text": f"Utterance {token}. {FILLER}",
+                    "audio_start": sent * self.utterance_ms,
+                    "audio_end": (sent + 1) * self.utterance_ms,
+                }))
+                sent += 1
+
+    def start(self):
+        ready = threading.Event()
+
+        async def serve():
+            server = await websockets.serve(self.handle, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]
+            ready.set()
+
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(serve(), self.loop)
+        ready.wait()
+        return f"ws://{self.host}:{self.port}/v2/realtime/ws"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_POST(self):
+        body = self._body()
+        mock = self.server.mock
+        if self.path.endswith("/chat/completions"):
+            time.sleep(mock.chat_latency)
+            prompt = " ".join(m["content"] for m in json.loads(body)["messages"])
+            token = newest_token(prompt)
+            mock.record("chat")
+            self._json({
+                "id": "chatcmpl-mock", "object": "chat.completion", "model": "mock",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                    "role": "assistant", "content": f"Summary through {token}." if token else "Summary.",
+                }}],
+            })
+        elif self.path.endswith("/upload"):
+            mock.record("upload")
+            self._json({"upload_url": f"http://{self.headers['Host']}/audio/{uuid.uuid4().hex}"})
+        elif self.path.endswith("/transcript"):
+            mock.record("submit")
+            transcript_id = uuid.uuid4().hex
+            mock.jobs[transcript_id] = time.monotonic() + mock.transcript_seconds
+            self._json({"id": transcript_id, "status": "queued"})
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def do_GET(self):
+        mock = self.server.mock
+        transcript_id = self.path.rsplit("/", 1)[-1]
+        ready_at = mock.jobs.get(transcript_id)
+        if ready_at is None:
+            self._json({"error": "not found"}, 404)
+            return
+        mock.record("poll")
+        if time.monotonic() < ready_at:
+            self._json({"id": transcript_id, "status": "processing"})
+            return
+        utterances = [
+            {"speaker": i % 2, "start": i * 2000, "end": (i + 1) * 2000, "text": f"Utterance {i}. {FILLER}"}
+            for i in range(mock.utterances)
+        ]
+        self._json({"id": transcript_id, "status": "completed", "utterances": utterances})
+
+
+class HttpServer:
+    """AssemblyAI REST (upload, submit, poll) and OpenAI chat completions."""
+
+    def __init__(self, chat_latency=0.5, transcript_seconds=5.0, utterances=50, host="127.0.0.1", port=0):
+        self.chat_latency = chat_latency
+        self.transcript_seconds = transcript_seconds
+        self.utterances = utterances
+        self.jobs = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.mock = self
+
+    def record(self, kind):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
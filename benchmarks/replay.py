@@ -0,0 +1,331 @@
+"""Replay load against the apps with AssemblyAI and OpenAI replaced by local mocks.
+
+    python benchmarks/replay.py live --meetings 20 --seconds 60 --speed 4
+    python benchmarks/replay.py batch --jobs 200 --transcript-seconds 5
+    python benchmarks/replay.py uploads --backend-url http://127.0.0.1:8000 --uploads 8
+
+live    starts the Flask app (Video transcription1) against a mock realtime
+        socket and chat endpoint, streams N meetings of audio through
+        /transcribe and measures transcript-to-browser and summary latency.
+batch   runs the AssemblyAI client behind TextSummarizerApp (VD batch mode)
+        against the mock REST API and measures job latency.
+uploads posts synthetic recordings to a running Whisper backend (backend/main.py).
+        The recordings are noise, so start the backend with VAD_MAX_SILENCE=0 or
+        silence trimming may leave little for Whisper to decode.
+
+Results are printed and, with --json, written to a file so runs can be compared.
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import websockets
+
+from mock_services import HttpServer, RealtimeServer, emitted_at, newest_token
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+FLASK_DIR = os.path.join(ROOT, "Video transcription1", "Video transcription1")
+VD_DIR = os.path.join(ROOT, "VD", "VD")
+
+CHUNK_MS = 100
+CHUNK_SAMPLES = 16000 * CHUNK_MS // 1000
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(math.ceil(p / 100 * len(ordered))) - 1)]
+
+    return {"count": len(ordered), "p50": pick(50), "p90": pick(90), "p99": pick(99), "max": ordered[-1]}
+
+
+def rss_bytes(pid):
+    if psutil is not None:
+        return psutil.Process(pid).memory_info().rss
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler:
+    """Peak resident memory of a process, sampled in the background."""
+
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = rss_bytes(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+
+def start_flask(realtime_url, http_url, workdir):
+    port = free_port()
+    env = dict(os.environ,
+               ASSEMBLYAI_URL=realtime_url, ASSEMBLYAI_API_KEY="mock",
+               OPENAI_API_BASE=f"{http_url}/v1", OPENAI_API_KEY="mock",
+               # The meetings stream silence; the VAD gate would keep it from the mock
+               LIVE_VAD_MAX_SILENCE="0",
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    process = subprocess.Popen(
+        [sys.executable, "-c", f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+        cwd=FLASK_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process, port
+
+
+async def meeting(url, seconds, speed, drain, stats):
+    silence = bytes(CHUNK_SAMPLES * 2)  # PCM16 zeros, what the page sends
+
+    async def receive(ws):
+        async for message in ws:
+            now = time.perf_counter()
+            data = json.loads(message)
+            for key, latencies in (("text", stats["transcript"]), ("summary", stats["summary"])):
+                if data.get(key):
+                    token = newest_token(data[key])
+                    emitted = emitted_at(token) if token else None
+                    if emitted is not None:
+                        latencies.append(now - emitted)
+            if data.get("error"):
+                stats["errors"].append(data["error"])
+
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"format": "s16le", "sample_rate": 16000}))
+        receiver = asyncio.ensure_future(receive(ws))
+        started = time.perf_counter()
+        for i in range(int(seconds * 1000 / CHUNK_MS)):
+            await ws.send(silence)
+            # Pace like a microphone (sped up), without drifting
+            delay = started + (i + 1) * CHUNK_MS / 1000 / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        stats["audio_seconds"] += seconds
+        await asyncio.sleep(drain)
+        receiver.cancel()
+
+
+def run_live(args):
+    realtime = RealtimeServer(utterance_ms=args.utterance_ms)
+    http = HttpServer(chat_latency=args.chat_latency)
+    realtime_url, http_url = realtime.start(), http.start()
+    stats = {"transcript": [], "summary": [], "errors": [], "audio_seconds": 0}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        process, port = start_flask(realtime_url, http_url, workdir)
+        try:
+            with MemorySampler(process.pid) as memory:
+                async def run():
+                    url = f"ws://127.0.0.1:{port}/transcribe"
+                    await asyncio.gather(*(
+                        meeting(url, args.seconds, args.speed, args.drain, stats) for _ in range(args.meetings)
+                    ))
+
+                started = time.perf_counter()
+                asyncio.run(run())
+                elapsed = time.perf_counter() - started
+        finally:
+            process.terminate()
+            process.wait()
+
+    return {
+        "scenario": "live",
+        "meetings": args.meetings,
+        "elapsed_seconds": elapsed,
+        "transcript_latency": percentiles(stats["transcript"]),
+        "summary_latency": percentiles(stats["summary"]),
+        "finals_per_second": len(stats["transcript"]) / elapsed,
+        "audio_seconds_per_second": stats["audio_seconds"] / elapsed,
+        "peak_rss_bytes": memory.peak,
+        "upstream_requests": dict(http.requests),
+        "errors": stats["errors"][:10],
+    }
+
+
+def run_batch(args):
+    sys.path.insert(0, VD_DIR)
+    import assemblyai_client as aai
+    import batch
+
+    http = HttpServer(transcript_seconds=args.transcript_seconds, utterances=args.utterances)
+    aai.API_URL = f"{http.start()}/v2"
+    jobs = [{"url": f"https://example.com/audio/{i}.mp3", "name": f"{i:04d}"} for i in range(args.jobs)]
+
+    with tempfile.TemporaryDirectory() as out_dir, MemorySampler(os.getpid()) as memory:
+        started = time.time()
+        failures = batch.run_batch(jobs, "mock", out_dir, concurrency=args.concurrency)
+        elapsed = time.time() - started
+        # Each job's .txt is written as soon as it completes
+        latencies = [
+            os.path.getmtime(os.path.join(out_dir, f"{job['name']}.txt")) - started
+            for job in jobs if job["name"] not in failures
+        ]
+
+    return {
+        "scenario": "batch",
+        "jobs": args.jobs,
+        "elapsed_seconds": elapsed,
+        "job_latency": percentiles(latencies),
+        "jobs_per_second": len(latencies) / elapsed,
+        "peak_rss_bytes": memory.peak,
+        "upstream_requests": dict(http.requests),
+        "errors": list(failures.values())[:10],
+    }
+
+
+def synthetic_wav(seconds, seed):
+    # Distinct low-level noise per upload so the transcript cache can't short-circuit it
+    rng = random.Random(seed)
+    frames = struct.pack(f"<{16000 * seconds}h", *(rng.randint(-300, 300) for _ in range(16000 * seconds)))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(frames)
+    return buffer.getvalue()
+
+
+def run_uploads(args):
+    url = f"{args.backend_url.rstrip('/')}/transcribe/"
+    seed = time.time_ns()
+    recordings = [synthetic_wav(args.upload_seconds, seed + i) for i in range(args.uploads)]
+
+    def upload(audio):
+        started = time.perf_counter()
+        response = requests.post(url, files={"file": ("bench.wav", audio, "audio/wav")}, timeout=600)
+        return time.perf_counter() - started, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(upload, recordings))
+    elapsed = time.perf_counter() - started
+    ok = [latency for latency, status in results if status == 200]
+
+    return {
+        "scenario": "uploads",
+        "uploads": args.uploads,
+        "elapsed_seconds": elapsed,
+        "upload_latency": percentiles(ok),
+        "audio_seconds_per_second": len(ok) * args.upload_seconds / elapsed,
+        "status_codes": sorted({status for _, status in results}),
+    }
+
+
+def print_report(report):
+    print(f"== {report['scenario']} ({report['elapsed_seconds']:.1f}s)")
+    for key, value in report.items():
+        if key in ("scenario", "elapsed_seconds"):
+            continue
+        if isinstance(value, dict) and "count" in value:
+            if value["count"]:
+                print(f"  {key:<26} n={value['count']:<6} p50={value['p50'] * 1000:8.1f}ms "
+                      f"p90={value['p90'] * 1000:8.1f}ms p99={value['p99'] * 1000:8.1f}ms max={value['max'] * 1000:8.1f}ms")
+            else:
+                print(f"  {key:<26} no samples")
+        elif key == "peak_rss_bytes":
+            print(f"  {key:<26} {value / 2 ** 20:.1f} MiB" if value else f"  {key:<26} unavailable")
+        elif isinstance(value, float):
+            print(f"  {key:<26} {value:.2f}")
+        else:
+            print(f"  {key:<26} {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", help="also write the report to this file")
+    scenarios = parser.add_subparsers(dest="scenario", required=True)
+
+    live = scenarios.add_parser("live", help="concurrent meetings through the Flask /transcribe socket")
+    live.add_argument("--meetings", type=int, default=10)
+    live.add_argument("--seconds", type=float, default=60, help="audio per meeting")
+    live.add_argument("--speed", type=float, default=1.0, help="stream audio this many times faster than real time")
+    live.add_argument("--utterance-ms", type=int, default=2000, help="audio per scripted final transcript")
+    live.add_argument("--chat-latency", type=float, default=0.5, help="seconds per mock chat completion")
+    live.add_argument("--drain", type=float, default=5.0, help="seconds to wait for late messages")
+
+    batch = scenarios.add_parser("batch", help="AssemblyAI REST jobs through the VD batch client")
+    batch.add_argument("--jobs", type=int, default=100)
+    batch.add_argument("--concurrency", type=int, default=16)
+    batch.add_argument("--transcript-seconds", type=float, default=5.0, help="mock processing time per job")
+    batch.add_argument("--utterances", type=int, default=50, help="utterances per mock transcript")
+
+    uploads = scenarios.add_parser("uploads", help="file uploads to a running Whisper backend (VAD_MAX_SILENCE=0)")
+    uploads.add_argument("--backend-url", default="http://127.0.0.1:8000")
+    uploads.add_argument("--uploads", type=int, default=8)
+    uploads.add_argument("--concurrency", type=int, default=4)
+    uploads.add_argument("--upload-seconds", type=int, default=10, help="length of each synthetic recording")
+
+    args = parser.parse_args()
+    report = {"live": run_live, "batch": run_batch, "uploads": run_uploads}[args.scenario](args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,20 @@
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import whisper
+from utils.cache import TranscriptCache, file_digest
+from utils.chunking import LongAudioTranscriber
+from utils.inference import QueueFull, WhisperWorkerPool
+from utils import metrics
+from utils.segments import append_segments, to_result
 from utils.summarizer import generate_summary
+from utils.uploads import UploadLimitMiddleware, saved_upload
+from utils.vad import remap_futures, trim_silence
+import asyncio
+import json
 import os
+import time
 
 app = FastAPI()
 
@@ -13,15 +25,144 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-model = whisper.load_model("base")
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "base")
+
+# Whisper workers transcribe concurrent uploads side by side; tune with env vars
+whisper_pool = WhisperWorkerPool(
+    WHISPER_MODEL,
+    workers=int(os.environ.get("WHISPER_WORKERS", 0)) or None,
+    max_pending=int(os.environ.get("WHISPER_MAX_PENDING", 256)),
+)
+
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_MB", 1024)) * 1024 * 1024
+app.add_middleware(UploadLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES)
+
+# Recordings longer than this are split at silences and transcribed in parallel processes
+LONG_AUDIO_SECONDS = int(os.environ.get("LONG_AUDIO_SECONDS", 600))
+long_audio = LongAudioTranscriber(
+    WHISPER_MODEL,
+    processes=int(os.environ.get("LONG_AUDIO_PROCESSES", 0)) or None,
+)
+
+# Transcripts keyed by audio content hash + model, shared with the desktop app
+cache = TranscriptCache()
+
+# /transcribe/stream splits uploads into chunks about this long, so the first segments
+# arrive after one chunk's worth of inference instead of the whole file's
+STREAM_CHUNK_SECONDS = int(os.environ.get("STREAM_CHUNK_SECONDS", 20))
+
+# Silences longer than this are shortened before inference (0 disables trimming)
+VAD_MAX_SILENCE = float(os.environ.get("VAD_MAX_SILENCE", 1.0))
+
+STAGE_SECONDS = metrics.histogram("transcription_stage_seconds", "Time per upload pipeline stage", labels=("stage",))
+CACHE_LOOKUPS = metrics.counter("transcript_cache_lookups_total", "Transcript cache lookups", labels=("result",))
+AUDIO_SECONDS = metrics.counter("audio_seconds_total", "Decoded upload audio", labels=("kind",))
+metrics.gauge("whisper_queue_windows", "30 s windows of audio waiting for or in Whisper transcription").set_function(lambda: whisper_pool.depth)
+metrics.gauge("long_audio_queue_chunks", "Long-audio chunks waiting for or in a worker process").set_function(
+    lambda: long_audio.depth)
+
+# Optional sampling profiler at GET /debug/profile?seconds=N (collapsed stacks)
+PROFILER_ENABLED = os.environ.get("METRICS_PROFILER") == "1"
+
+async def start_transcription(file, long, chunk_seconds=None):
+    """Returns (cache_key, cached result or None, per-part futures of segment lists).
+    chunk_seconds splits the audio into parts of about that length."""
+    started = time.perf_counter()
+    options = {"engine": "whisper", "model": WHISPER_MODEL, "vad": VAD_MAX_SILENCE}
+    if chunk_seconds:
+        options["chunk_seconds"] = chunk_seconds  # chunked transcripts differ slightly at the cuts
+    async with saved_upload(file, MAX_UPLOAD_BYTES) as filepath:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="upload")
+        cache_key = cache.key(await run_in_threadpool(file_digest, filepath), **options)
+        result = await run_in_threadpool(cache.get, cache_key)
+        CACHE_LOOKUPS.inc(result="miss" if result is None else "hit")
+        if result is not None:
+            return cache_key, result, []
+        # ffmpeg decoding blocks, keep it off the event loop
+        with STAGE_SECONDS.time(stage="load_audio"):
+            audio = await run_in_threadpool(whisper.load_audio, filepath)
+
+    offsets = None
+    if VAD_MAX_SILENCE > 0:
+        with STAGE_SECONDS.time(stage="vad"):
+            audio, offsets, removed = await run_in_threadpool(trim_silence, audio, max_silence=VAD_MAX_SILENCE)
+        AUDIO_SECONDS.inc(removed, kind="silence_removed")
+    AUDIO_SECONDS.inc(len(audio) / whisper.audio.SAMPLE_RATE, kind="transcribed")
+
+    try:
+        if long or len(audio) > LONG_AUDIO_SECONDS * whisper.audio.SAMPLE_RATE:
+            futures = long_audio.submit_segments(audio, chunk_seconds)
+        else:
+            futures = whisper_pool.submit_segments(audio, chunk_seconds)
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Transcription queue is full, try again later",
+                            headers={"Retry-After": "10"})
+    # Segment timestamps refer to the trimmed audio; report them on the original's timeline
+    return cache_key, None, remap_futures(futures, offsets) if offsets else futures
 
 @app.post("/transcribe/")
-async def transcribe(file: UploadFile = File(...)):
-    filepath = f"temp_{file.filename}"
-    with open(filepath, "wb") as f:
-        f.write(await file.read())
-    result = model.transcribe(filepath)
-    os.remove(filepath)
+async def transcribe(file: UploadFile = File(...), long: bool = False):
+    cache_key, result, futures = await start_transcription(file, long)
+    if result is None:
+        segments = []
+        with STAGE_SECONDS.time(stage="transcribe"):
+            parts = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+        for part in parts:
+            append_segments(segments, part)
+        result = to_result(segments)
+        await run_in_threadpool(cache.put, cache_key, result)
     text = result["text"]
-    summary = generate_summary(text)
+    with STAGE_SECONDS.time(stage="summary"):
+        summary = await run_in_threadpool(generate_summary, text)
     return {"transcript": text, "summary": summary}
+
+@app.post("/transcribe/stream")
+async def transcribe_stream(file: UploadFile = File(...), long: bool = False):
+    """NDJSON: one {"type": "segment"} line per segment as soon as the chunk holding
+    it is decoded, then a final {"type": "summary"} line with the full transcript and
+    summary."""
+    cache_key, result, futures = await start_transcription(file, long, STREAM_CHUNK_SECONDS)
+
+    def line(payload):
+        return json.dumps(payload) + "\n"
+
+    async def events():
+        segments = []
+        try:
+            if result is not None:
+                segments = result["segments"]
+                for segment in segments:
+                    yield line({"type": "segment", **segment})
+            else:
+                # Parts finish out of order across workers; emit them in timeline order
+                started = time.perf_counter()
+                for future in futures:
+                    start = len(segments)
+                    append_segments(segments, await asyncio.wrap_future(future))
+                    for segment in segments[start:]:
+                        yield line({"type": "segment", **segment})
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage="transcribe")
+                await run_in_threadpool(cache.put, cache_key, to_result(segments))
+            text = to_result(segments)["text"]
+            with STAGE_SECONDS.time(stage="summary"):
+                summary = await run_in_threadpool(generate_summary, text)
+            yield line({"type": "summary", "transcript": text, "summary": summary})
+        except Exception as e:
+            yield line({"type": "error", "error": str(e)})
+        finally:
+            # Client gone or failed: drop the chunks that haven't started
+            for future in futures:
+                future.cancel()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/debug/profile")
+async def profile(seconds: float = 10.0):
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled, set METRICS_PROFILER=1")
+    stacks = await run_in_threadpool(metrics.sample_stacks, min(seconds, 60.0))
+    return PlainTextResponse(stacks)
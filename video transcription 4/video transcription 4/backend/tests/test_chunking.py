@@ -0,0 +1,51 @@
+import numpy as np
+
+from utils.chunking import SAMPLE_RATE, make_chunks, own_segments, split_points
+
+
+def noisy_audio(seconds, quiet_at=()):
+    audio = np.random.default_rng(0).normal(0, 0.1, int(seconds * SAMPLE_RATE)).astype(np.float32)
+    for at in quiet_at:
+        audio[int(at * SAMPLE_RATE):int((at + 0.5) * SAMPLE_RATE)] = 0
+    return audio
+
+
+def test_split_points_cut_at_the_quietest_frame():
+    audio = noisy_audio(70, quiet_at=(27,))
+    cuts = split_points(audio, chunk_seconds=30, search_seconds=5)
+    assert cuts[0] == 0 and cuts[-1] == len(audio)
+    assert 27 <= cuts[1] / SAMPLE_RATE <= 27.5
+
+
+def test_short_audio_is_one_chunk():
+    audio = noisy_audio(20)
+    assert make_chunks(audio, chunk_seconds=30) == [(0, len(audio), 0, len(audio))]
+
+
+def test_chunks_own_the_whole_timeline_once():
+    audio = noisy_audio(200)
+    chunks = make_chunks(audio, chunk_seconds=20, overlap_seconds=2)
+    assert chunks[0][2] == 0 and chunks[-1][3] == len(audio)
+    for (_, end, _, own_end), (start, _, own_start, _) in zip(chunks, chunks[1:]):
+        assert own_end == own_start  # owned spans tile the audio
+        assert start < own_start and end > own_end  # decoded with overlap on both sides
+    for start, end, own_start, own_end in chunks:
+        assert start <= own_start < own_end <= end
+        # Short chunks stay within one 30 s Whisper window
+        assert (end - start) / SAMPLE_RATE <= 30
+
+
+def test_segment_on_a_cut_goes_to_exactly_one_chunk():
+    # Two chunks cut at 20 s; both decoded the segment that straddles the cut
+    straddling = {"start": 19.0, "end": 21.0, "text": " shared "}
+    first = own_segments([dict(straddling)], 0.0, 0.0, 20.0)
+    second = own_segments([{"start": 1.0, "end": 3.0, "text": " shared "}], 18.0, 20.0, 40.0)
+
+    assert first == []  # midpoint 20.0 is owned by the chunk that starts there
+    assert second == [{"start": 19.0, "end": 21.0, "text": "shared"}]
+
+
+def test_own_segments_moves_to_the_global_timeline():
+    segments = [{"start": 0.5, "end": 1.5, "text": "a"}, {"start": 9.0, "end": 10.0, "text": "b"}]
+    owned = own_segments(segments, 100.0, 100.0, 109.0)
+    assert owned == [{"start": 100.5, "end": 101.5, "text": "a"}]
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from utils.vad import FRAME_SECONDS, SAMPLE_RATE, OffsetMap, SilenceGate, trim_silence
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def pcm16_frame(samples):
+    return (samples * 32767).astype("<i2").tobytes()
+
+
+def test_offset_map_end_on_cut_belongs_to_span_before():
+    offsets = OffsetMap()
+    offsets.add(0.0, 0.0)
+    offsets.add(2.0, 10.0)  # 8 s cut out of the original after 2 s
+
+    assert offsets.to_original(1.0) == 1.0
+    assert offsets.to_original(2.0) == 10.0  # a start on the cut begins the next span
+    assert offsets.to_original(2.0, end=True) == 2.0  # an end on the cut closes the previous one
+    assert offsets.to_original(3.5, end=True) == 11.5
+
+
+def test_offset_map_merges_contiguous_spans():
+    offsets = OffsetMap()
+    offsets.add(0.0, 0.0)
+    offsets.add(1.0, 1.0)
+    assert offsets.trimmed == [0.0]
+
+
+def test_trim_silence_flat_input_is_untouched():
+    for audio in (silence(5), tone(5), np.random.default_rng(0).normal(0, 0.05, 5 * SAMPLE_RATE).astype(np.float32)):
+        trimmed, offsets, removed = trim_silence(audio)
+        assert len(trimmed) == len(audio)
+        assert removed == 0.0
+        assert offsets.to_original(3.0) == 3.0
+
+
+def test_trim_silence_shortens_long_silence_and_maps_back():
+    audio = np.concatenate([tone(2), silence(6), tone(2)])
+    trimmed, offsets, removed = trim_silence(audio, max_silence=1.0)
+
+    assert removed == pytest.approx(5.0, abs=2 * FRAME_SECONDS)
+    assert len(trimmed) == len(audio) - int(round(removed * SAMPLE_RATE))
+    # Speech after the cut maps back to where it was in the original
+    second_tone_start = len(trimmed) / SAMPLE_RATE - 2
+    assert offsets.to_original(second_tone_start) == pytest.approx(8.0, abs=FRAME_SECONDS)
+    assert offsets.to_original(0.5) == 0.5
+
+
+def test_trim_silence_shorter_than_a_frame():
+    audio = tone(FRAME_SECONDS / 2)
+    trimmed, offsets, removed = trim_silence(audio)
+    assert len(trimmed) == len(audio) and removed == 0.0
+
+
+def test_silence_gate_passes_speech_from_the_first_frame():
+    frame_ms = 30
+    gate = SilenceGate(frame_ms, max_silence=1.0)
+    speech = pcm16_frame(tone(frame_ms / 1000))
+    sent = [gate.accept(speech) for _ in range(50)]
+    assert all(len(frames) == 1 for frames in sent)
+    assert gate.removed_ms == 0
+
+
+def test_silence_gate_drops_long_silence_and_keeps_preroll():
+    frame_ms = 30
+    gate = SilenceGate(frame_ms, max_silence=0.6)  # hangover and pre-roll of 10 frames
+    speech = pcm16_frame(tone(frame_ms / 1000))
+    quiet = pcm16_frame(silence(frame_ms / 1000))
+
+    for _ in range(20):
+        gate.accept(speech)
+    sent = sum(len(gate.accept(quiet)) for _ in range(100))
+    assert sent == gate.hangover
+    assert gate.removed_ms == (100 - 2 * gate.hangover) * frame_ms
+
+    resumed = gate.accept(speech)
+    assert len(resumed) == gate.hangover + 1  # held pre-roll, then the speech frame
+    # The resumed speech frame is frame 120 of the original stream
+    assert gate.offsets.to_original(gate.sent_ms - frame_ms) == 120 * frame_ms
+
+
+def test_silence_gate_all_silent_stream():
+    frame_ms = 30
+    gate = SilenceGate(frame_ms, max_silence=0.6)
+    quiet = pcm16_frame(silence(frame_ms / 1000))
+    sent = sum(len(gate.accept(quiet)) for _ in range(100))
+    assert sent == gate.hangover
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_DIR = os.environ.get("TORU_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "toru", "transcripts"))
+DEFAULT_MAX_BYTES = int(os.environ.get("TORU_CACHE_MB", 512)) * 1024 * 1024
+
+
+def file_digest(path, chunk_bytes=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_bytes):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """On-disk transcript cache keyed by audio identity plus model/options.
+
+    Entries are JSON files; reading one bumps its mtime, and writes evict the least
+    recently used entries once the directory grows past max_bytes. Writes are atomic
+    renames, so several processes (the backend and the desktop app) can share one
+    directory.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source, **options):
+        # source: content digest of the audio, or a URL plus its validators (ETag etc.)
+        payload = json.dumps({"source": source, **options}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+            return value
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key, value):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self._evict()
+
+    def _evict(self):
+        with self.lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
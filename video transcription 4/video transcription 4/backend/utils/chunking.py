@@ -0,0 +1,136 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils import metrics
+from utils.segments import gather_segments
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.1  # energy resolution when looking for a quiet place to cut
+
+CHUNK_SECONDS = metrics.histogram("long_audio_chunk_seconds", "Long-audio chunk time from submission to transcript")
+
+
+def split_points(audio, chunk_seconds=300, search_seconds=15):
+    """Sample offsets that cut the audio about every chunk_seconds, each at the
+    quietest 100 ms frame within +/- search_seconds of the target."""
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = len(audio) // frame
+    energy = np.square(audio[:n_frames * frame].reshape(n_frames, frame)).mean(axis=1)
+
+    cuts = [0]
+    chunk_frames = int(chunk_seconds / FRAME_SECONDS)
+    search_frames = int(search_seconds / FRAME_SECONDS)
+    last = 0
+    while n_frames - last > chunk_frames + search_frames:
+        lo = max(last + chunk_frames - search_frames, last + 1)
+        hi = min(last + chunk_frames + search_frames, n_frames)
+        last = lo + int(np.argmin(energy[lo:hi]))
+        cuts.append(last * frame + frame // 2)
+    cuts.append(len(audio))
+    return cuts
+
+
+def make_chunks(audio, chunk_seconds=300, overlap_seconds=2):
+    """(start, end, own_start, own_end) sample ranges. Each chunk is decoded with a
+    little overlap on both sides, but only owns the span between its two cuts."""
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    # Short chunks look for a cut nearby, so they stay within one 30 s Whisper window
+    cuts = split_points(audio, chunk_seconds, min(15, chunk_seconds / 8))
+    return [
+        (max(own_start - overlap, 0), min(own_end + overlap, len(audio)), own_start, own_end)
+        for own_start, own_end in zip(cuts, cuts[1:])
+    ]
+
+
+_model = None
+
+
+def _init_worker(model_name, threads):
+    global _model
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)
+    _model = whisper.load_model(model_name, device="cpu")
+
+
+def own_segments(segments, offset, own_start, own_end):
+    """Whisper segments of a chunk decoded from `offset` (seconds), moved to the
+    global timeline and limited to those the chunk owns."""
+    owned = []
+    for s in segments:
+        start, end = s["start"] + offset, s["end"] + offset
+        # A segment belongs to the chunk that owns its midpoint; the copy decoded in the
+        # neighbour's overlap is dropped there
+        if own_start <= (start + end) / 2 < own_end:
+            owned.append({"start": start, "end": end, "text": s["text"].strip()})
+    return owned
+
+
+def _transcribe_chunk(audio, offset, own_start, own_end):
+    return own_segments(_model.transcribe(audio, fp16=False)["segments"], offset, own_start, own_end)
+
+
+class LongAudioTranscriber:
+    """Transcribes long recordings as silence-aligned chunks across a process pool."""
+
+    def __init__(self, model_name="base", processes=None, chunk_seconds=300, overlap_seconds=2):
+        self.model_name = model_name
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.pool = None
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    @property
+    def depth(self):
+        return self.pending
+
+    def _get_pool(self):
+        # Started on first use so short uploads never pay for the extra models
+        with self.lock:
+            if self.pool is None:
+                # Spawn, not fork: the parent already runs Whisper threads and an initialized
+                # torch/OpenMP pool, and forking a multithreaded process can deadlock children
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, 1),
+                )
+            return self.pool
+
+    def submit_segments(self, audio, chunk_seconds=None):
+        """One Future per chunk, in order, each resolving to the segments that chunk
+        owns, already on the global timeline. chunk_seconds overrides the default
+        chunk length (shorter chunks return their first results sooner)."""
+        pool = self._get_pool()
+        chunks = make_chunks(audio, chunk_seconds or self.chunk_seconds, self.overlap_seconds)
+        with self.lock:
+            self.pending += len(chunks)
+        submitted = time.perf_counter()
+
+        def done(future):
+            CHUNK_SECONDS.observe(time.perf_counter() - submitted)
+            with self.lock:
+                self.pending -= 1
+
+        futures = []
+        for start, end, own_start, own_end in chunks:
+            future = pool.submit(
+                _transcribe_chunk, audio[start:end], start / SAMPLE_RATE,
+                own_start / SAMPLE_RATE, own_end / SAMPLE_RATE,
+            )
+            future.add_done_callback(done)
+            futures.append(future)
+        return futures
+
+    def submit(self, audio):
+        """Returns a Future with a transcribe()-like dict for the whole recording."""
+        return gather_segments(self.submit_segments(audio))
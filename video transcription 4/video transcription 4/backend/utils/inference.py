@@ -0,0 +1,108 @@
+import math
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+import torch
+import whisper
+
+from utils import metrics
+from utils.chunking import make_chunks, own_segments
+from utils.segments import gather_segments
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+WINDOW_SAMPLES = whisper.audio.N_SAMPLES  # queue capacity is counted in 30 s windows
+CHUNK_OVERLAP_SECONDS = 2  # decoded on each side of a chunk when a request is split
+
+TRANSCRIBE_SECONDS = metrics.histogram("whisper_transcribe_seconds", "Whisper transcribe() time per request")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class WhisperWorkerPool:
+    """A bounded queue of uploads in front of a pool of Whisper worker threads.
+
+    Each worker owns its own model (decoding installs hooks on the model, so
+    instances can't be shared) and runs the full transcribe() on one request at a
+    time, keeping its timestamp seeking, temperature fallback and conditioning on
+    previous text. Concurrent uploads run side by side on different workers; they
+    are not batched into shared forward passes, because transcribe() decodes each
+    recording window by window with per-recording state that whisper.decode()
+    can't carry for a batch.
+    """
+
+    def __init__(self, model_name="base", workers=None, max_pending=256):
+        workers = workers or max(1, min(4, os.cpu_count() or 1))
+        self.max_pending = max_pending
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+
+        # Split the cores between workers instead of letting every worker use all of them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+        for i in range(workers):
+            model = whisper.load_model(model_name, device="cpu")
+            threading.Thread(target=self._run, args=(model,), name=f"whisper-{i}", daemon=True).start()
+
+    @property
+    def depth(self):
+        return self.pending
+
+    def submit_segments(self, audio, chunk_seconds=None):
+        """Queue decoded 16 kHz audio; returns Futures of its segments in timeline
+        order, the same shape as LongAudioTranscriber.submit_segments.
+
+        By default the whole recording is one request. With chunk_seconds it is cut
+        at silences into chunks that are queued as separate requests, so the first
+        chunks finish (and can be streamed) while later ones are still waiting.
+        """
+        if chunk_seconds:
+            parts = [
+                (audio[start:end], (start / SAMPLE_RATE, own_start / SAMPLE_RATE, own_end / SAMPLE_RATE))
+                for start, end, own_start, own_end in make_chunks(audio, chunk_seconds, CHUNK_OVERLAP_SECONDS)
+            ]
+        else:
+            parts = [(audio, None)]
+        windows = [max(math.ceil(len(part) / WINDOW_SAMPLES), 1) for part, _ in parts]
+        with self.lock:
+            if self.pending + sum(windows) > self.max_pending:
+                raise QueueFull(f"{self.pending} windows already queued")
+            self.pending += sum(windows)
+        futures = []
+        for (part, span), part_windows in zip(parts, windows):
+            future = Future()
+            self.queue.put((future, part, part_windows, span))
+            futures.append(future)
+        return futures
+
+    def submit(self, audio):
+        """Like submit_segments, but a single Future with a transcribe()-like dict."""
+        return gather_segments(self.submit_segments(audio))
+
+    def _run(self, model):
+        while True:
+            future, audio, windows, span = self.queue.get()
+            # The caller may have gone away (a closed stream cancels the awaited future);
+            # don't spend Whisper time on it, and never resolve a cancelled future
+            if not future.set_running_or_notify_cancel():
+                with self.lock:
+                    self.pending -= windows
+                continue
+            try:
+                with TRANSCRIBE_SECONDS.time():
+                    result = model.transcribe(audio, fp16=False)
+                if span is None:
+                    future.set_result([
+                        {"start": s["start"], "end": s["end"], "text": s["text"].strip()}
+                        for s in result["segments"]
+                    ])
+                else:
+                    future.set_result(own_segments(result["segments"], *span))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self.lock:
+                    self.pending -= windows
@@ -0,0 +1,38 @@
+import threading
+from concurrent.futures import Future
+
+
+def append_segments(segments, new):
+    """Append decoded segments in order, skipping a repeat of the previous segment
+    (same text, overlapping in time) that both sides of a chunk boundary decoded."""
+    for segment in new:
+        if segments and segment["text"] == segments[-1]["text"] and segment["start"] < segments[-1]["end"]:
+            continue
+        segments.append(dict(segment, id=len(segments)))
+    return segments
+
+
+def to_result(segments):
+    return {"text": " ".join(s["text"] for s in segments if s["text"]), "segments": segments}
+
+
+def gather_segments(futures):
+    """Combine ordered futures of segment lists into one Future of a transcribe()-like dict."""
+    result = Future()
+    lock = threading.Lock()
+
+    def part_done(_):
+        with lock:
+            if result.done() or not all(f.done() for f in futures):
+                return
+            try:
+                segments = []
+                for future in futures:
+                    append_segments(segments, future.result())
+                result.set_result(to_result(segments))
+            except Exception as e:
+                result.set_exception(e)
+
+    for future in futures:
+        future.add_done_callback(part_done)
+    return result
@@ -0,0 +1,149 @@
+import re
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import svds
+
+# Extractive summarization that runs locally: sentences are scored on a sparse
+# TF-IDF matrix with LSA (truncated SVD) or TextRank, and the best ones are
+# returned in their original order. No network calls.
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just let me more
+most my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves yeah okay ok um uh like really actually going get got gonna
+know think right well also one just
+""".split())
+
+
+def split_sentences(text):
+    return [s.strip() for s in SENTENCE_END.split(text) if s and s.strip()]
+
+
+def tfidf_matrix(sentences):
+    """Sentence x term CSR matrix with sublinear TF, smoothed IDF and unit-length rows."""
+    vocabulary = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for word in WORD.findall(sentence.lower()):
+            if word not in STOP_WORDS:
+                rows.append(i)
+                cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    n = len(sentences)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float64), (rows, cols)), shape=(n, len(vocabulary))
+    )
+    matrix.sum_duplicates()
+    matrix.data = 1.0 + np.log(matrix.data)
+    df = np.bincount(matrix.indices, minlength=len(vocabulary))
+    matrix = matrix @ sparse.diags(np.log((1.0 + n) / (1.0 + df)) + 1.0)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+class Summarizer:
+    """Scores sentences from their TF-IDF matrix; subclasses implement score()."""
+
+    name = None
+
+    def score(self, matrix):
+        raise NotImplementedError
+
+    def rank(self, text):
+        sentences = split_sentences(text)
+        if not sentences:
+            return RankedDocument([], np.array([], dtype=int))
+        matrix = tfidf_matrix(sentences)
+        if matrix.shape[1] == 0 or len(sentences) == 1:
+            return RankedDocument(sentences, np.arange(len(sentences)))
+        scores = self.score(matrix)
+        # Stable sort so ties keep document order
+        return RankedDocument(sentences, np.argsort(-scores, kind="stable"))
+
+    def summarize(self, text, sentence_count=5):
+        return self.rank(text).top(sentence_count)
+
+
+class LsaSummarizer(Summarizer):
+    """Steinberger & Jezek LSA: sentence length in the space of the top topics."""
+
+    name = "lsa"
+
+    def __init__(self, topics=10):
+        self.topics = topics
+
+    def score(self, matrix):
+        if min(matrix.shape) < 2:
+            # svds needs k < min(shape); a one-term (or one-sentence) matrix is tiny anyway
+            u, sigma, _ = np.linalg.svd(matrix.toarray(), full_matrices=False)
+            return np.linalg.norm(u[:, :self.topics] * sigma[:self.topics], axis=1)
+        k = max(1, min(self.topics, min(matrix.shape) - 1))
+        u, sigma, _ = svds(matrix, k=k)
+        return np.linalg.norm(u * sigma, axis=1)
+
+
+class TextRankSummarizer(Summarizer):
+    """PageRank over cosine similarity between sentences.
+
+    The n x n similarity matrix M M^T is never built: each power iteration
+    multiplies through the sparse TF-IDF matrix instead.
+    """
+
+    name = "textrank"
+
+    def __init__(self, damping=0.85, iterations=50, tolerance=1e-6):
+        self.damping = damping
+        self.iterations = iterations
+        self.tolerance = tolerance
+
+    def score(self, matrix):
+        n = matrix.shape[0]
+        self_similarity = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+
+        def similarity(x):
+            # (M M^T - diag) x, i.e. similarities without the self loops
+            return matrix @ (matrix.T @ x) - self_similarity * x
+
+        degree = similarity(np.ones(n))
+        degree[degree == 0] = 1.0
+        scores = np.full(n, 1.0 / n)
+        for _ in range(self.iterations):
+            updated = (1 - self.damping) / n + self.damping * similarity(scores / degree)
+            if np.abs(updated - scores).sum() < self.tolerance:
+                return updated
+            scores = updated
+        return scores
+
+
+class RankedDocument:
+    """Sentences plus their ranking, so any summary length is just a slice."""
+
+    def __init__(self, sentences, order):
+        self.sentences = sentences
+        self.order = order
+
+    def top(self, sentence_count):
+        chosen = sorted(self.order[:max(sentence_count, 0)])
+        return " ".join(self.sentences[i] for i in chosen)
+
+
+SUMMARIZERS = {cls.name: cls for cls in (LsaSummarizer, TextRankSummarizer)}
+
+
+def get_summarizer(method="lsa", **options):
+    try:
+        return SUMMARIZERS[method](**options)
+    except KeyError:
+        raise ValueError(f"Unknown summarizer {method!r}, expected one of {sorted(SUMMARIZERS)}")
+
+
+def generate_summary(text, sentence_count=5, method="lsa"):
+    return get_summarizer(method).summarize(text, sentence_count)
@@ -0,0 +1,69 @@
+import os
+import tempfile
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+CHUNK_BYTES = 1024 * 1024
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # boundaries and part headers around the file
+
+
+class UploadLimitMiddleware:
+    """Rejects oversized request bodies before they are read.
+
+    Starlette spools the whole multipart body to disk before a handler runs, so
+    the check in saved_upload alone comes too late. Bodies with a Content-Length
+    over the limit get a 413 straight away; chunked bodies are counted as they
+    arrive and fail as soon as they cross it.
+    """
+
+    def __init__(self, app, max_bytes):
+        self.app = app
+        self.limit = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.limit:
+            response = JSONResponse({"detail": f"Upload exceeds {self.limit} bytes"}, status_code=413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {self.limit} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+@asynccontextmanager
+async def saved_upload(file, max_bytes):
+    """Stream an UploadFile to a unique temp file, one chunk at a time, and yield its
+    path. The file is removed on exit whatever happens, and uploads larger than
+    max_bytes are rejected with 413."""
+    # ffmpeg sniffs the container itself, so the client's filename is never used
+    fd, path = tempfile.mkstemp(prefix="toru_upload_")
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await file.read(CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+                await run_in_threadpool(f.write, chunk)
+        yield path
+    finally:
+        await file.close()
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
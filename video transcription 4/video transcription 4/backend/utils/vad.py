@@ -0,0 +1,166 @@
+import bisect
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Energy-based voice activity detection. Silences longer than max_silence are
+# shortened to max_silence (half kept after the speech before, half before the
+# speech after, so words aren't clipped and endpointing still sees a pause), and an
+# OffsetMap translates timestamps on the trimmed audio back to the original.
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+MARGIN_DB = 12.0  # speech is this far above the noise floor...
+ABSOLUTE_FLOOR_DB = -55.0  # ...and never quieter than this (dBFS)
+
+
+def frame_db(frames):
+    """Mean power of each row of float samples in [-1, 1], in dBFS."""
+    return 10 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=-1) + 1e-10)
+
+
+class OffsetMap:
+    """Piecewise-linear map from trimmed-audio time to original time.
+
+    Each span starts at trimmed[i] in the trimmed audio and original[i] in the
+    original; within a span time advances 1:1. Units are whatever the caller uses.
+    """
+
+    def __init__(self):
+        self.trimmed = []
+        self.original = []
+
+    def add(self, trimmed_start, original_start):
+        if self.trimmed and trimmed_start - self.trimmed[-1] == original_start - self.original[-1]:
+            return  # contiguous with the current span
+        self.trimmed.append(trimmed_start)
+        self.original.append(original_start)
+
+    def to_original(self, t, end=False):
+        # An end time that falls exactly on a cut belongs to the span before it
+        i = (bisect.bisect_left if end else bisect.bisect_right)(self.trimmed, t) - 1
+        if i < 0:
+            return t
+        return self.original[i] + t - self.trimmed[i]
+
+    def map_segments(self, segments):
+        return [
+            dict(segment, start=self.to_original(segment["start"]), end=self.to_original(segment["end"], end=True))
+            for segment in segments
+        ]
+
+
+def trim_silence(audio, sample_rate=SAMPLE_RATE, max_silence=1.0):
+    """Returns (trimmed float audio, OffsetMap in seconds, seconds removed)."""
+    frame = int(FRAME_SECONDS * sample_rate)
+    n_frames = len(audio) // frame
+    offsets = OffsetMap()
+    if n_frames == 0:
+        offsets.add(0.0, 0.0)
+        return audio, offsets, 0.0
+
+    db = frame_db(audio[:n_frames * frame].reshape(n_frames, frame))
+    floor, loud = np.percentile(db, [10, 90])
+    if loud - floor < MARGIN_DB:
+        # Too little dynamic range to tell speech from noise (uniform level, or a noisy
+        # room where speech barely rises above it): trimming would only lose speech
+        offsets.add(0.0, 0.0)
+        return audio, offsets, 0.0
+    speech = db > max(floor + MARGIN_DB, ABSOLUTE_FLOOR_DB)
+
+    keep = np.ones(n_frames, dtype=bool)
+    half = max(int(max_silence / 2 / FRAME_SECONDS), 1)
+    # Silent runs as [start, end) frame ranges
+    edges = np.flatnonzero(np.diff(np.concatenate(([1], speech.astype(np.int8), [1]))))
+    for start, end in zip(edges[::2], edges[1::2]):
+        lo = start if start == 0 else start + half
+        hi = end if end == n_frames else end - half
+        if hi > lo:
+            keep[lo:hi] = False
+    if not keep.any():
+        offsets.add(0.0, 0.0)
+        return audio[:0], offsets, len(audio) / sample_rate
+
+    # The partial frame at the end goes with the last frame
+    sample_keep = np.repeat(keep, frame)
+    sample_keep = np.concatenate((sample_keep, np.full(len(audio) - len(sample_keep), keep[-1])))
+    runs = np.flatnonzero(np.diff(np.concatenate(([0], sample_keep.astype(np.int8), [0]))))
+    position = 0
+    for start, end in zip(runs[::2], runs[1::2]):
+        offsets.add(position / sample_rate, start / sample_rate)
+        position += end - start
+    trimmed = audio[sample_keep]
+    return trimmed, offsets, (len(audio) - len(trimmed)) / sample_rate
+
+
+def remap_futures(futures, offsets):
+    """Futures of segment lists on the trimmed timeline -> the same on the original.
+    Cancelling a mapped future cancels its source if that hasn't started yet."""
+    mapped = []
+    for future in futures:
+        result = Future()
+
+        def done(f, result=result):
+            if not result.set_running_or_notify_cancel():
+                return
+            try:
+                result.set_result(offsets.map_segments(f.result()))
+            except Exception as e:
+                result.set_exception(e)
+
+        def cancelled(r, future=future):
+            if r.cancelled():
+                future.cancel()
+
+        result.add_done_callback(cancelled)
+        future.add_done_callback(done)
+        mapped.append(result)
+    return mapped
+
+
+class SilenceGate:
+    """Streaming version for fixed-size PCM16 frames (the live socket).
+
+    accept() returns the frames to send now: speech, up to max_silence/2 of trailing
+    silence, and the pre-roll held back before speech resumes. The noise floor is
+    tracked as a slowly rising minimum, starting from ABSOLUTE_FLOOR_DB so that a
+    stream which opens with speech passes until real quiet frames pull the floor in.
+    Times in offsets are milliseconds.
+    """
+
+    def __init__(self, frame_ms, max_silence=1.0, floor_rise_db=0.05):
+        self.frame_ms = frame_ms
+        self.hangover = max(int(max_silence / 2 * 1000 / frame_ms), 1)
+        self.preroll = deque(maxlen=self.hangover)
+        self.floor_rise_db = floor_rise_db
+        self.floor = ABSOLUTE_FLOOR_DB
+        self.silent_frames = 0
+        self.frame_index = 0
+        self.sent_ms = 0
+        self.removed_ms = 0
+        self.offsets = OffsetMap()
+
+    def accept(self, frame):
+        index = self.frame_index
+        self.frame_index += 1
+        db = float(frame_db(np.frombuffer(frame, dtype="<i2") / 32768.0))
+        self.floor = min(db, self.floor + self.floor_rise_db)
+
+        if db > max(self.floor + MARGIN_DB, ABSOLUTE_FLOOR_DB):
+            self.silent_frames = 0
+            held, self.preroll = list(self.preroll), deque(maxlen=self.hangover)
+            return self._send(held + [(index, frame)])
+        self.silent_frames += 1
+        if self.silent_frames <= self.hangover:
+            return self._send([(index, frame)])
+        if len(self.preroll) == self.preroll.maxlen:
+            self.removed_ms += self.frame_ms
+        self.preroll.append((index, frame))
+        return []
+
+    def _send(self, frames):
+        for index, _ in frames:
+            self.offsets.add(self.sent_ms, index * self.frame_ms)
+            self.sent_ms += self.frame_ms
+        return [frame for _, frame in frames]
@@ -0,0 +1,46 @@
+const API_URL = "http://localhost:8000";
+
+export async function transcribe(file) {
+  const form = new FormData();
+  form.append("file", file);
+  const response = await fetch(`${API_URL}/transcribe/`, { method: "POST", body: form });
+  if (!response.ok) {
+    throw new Error(`Transcription failed: ${response.status}`);
+  }
+  return response.json();
+}
+
+// Streams NDJSON from /transcribe/stream so segments can be rendered as they are decoded.
+// onSegment({ id, start, end, text }) fires per segment, onSummary({ transcript, summary }) once at the end.
+export async function transcribeStream(file, { onSegment, onSummary } = {}) {
+  const form = new FormData();
+  form.append("file", file);
+  const response = await fetch(`${API_URL}/transcribe/stream`, { method: "POST", body: form });
+  if (!response.ok) {
+    throw new Error(`Transcription failed: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  const handle = (line) => {
+    if (!line.trim()) return;
+    const event = JSON.parse(line);
+    if (event.type === "segment" && onSegment) onSegment(event);
+    else if (event.type === "summary" && onSummary) onSummary(event);
+    else if (event.type === "error") throw new Error(event.error);
+  };
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let newline;
+    while ((newline = buffer.indexOf("\n")) >= 0) {
+      handle(buffer.slice(0, newline));
+      buffer = buffer.slice(newline + 1);
+    }
+  }
+  handle(buffer);
+}